@@ -1,83 +1,162 @@
-import sys
-import subprocess
-
-# List of required packages
-REQUIRED_PACKAGES = ["flask", "bcrypt", "pytz"]
-
-def check_dependencies():
-    """Check and install missing dependencies automatically."""
-    missing_packages = []
-
-    for package in REQUIRED_PACKAGES:
-        try:
-            __import__(package)
-        except ImportError:
-            missing_packages.append(package)
-
-    if missing_packages:
-        print(f"\n⚠️ Missing dependencies: {', '.join(missing_packages)}")
-        install = input("Would you like to install them now? (yes/no): ").strip().lower()
-        if install in ["y", "yes"]:
-            for package in missing_packages:
-                subprocess.run([sys.executable, "-m", "pip", "install", package])
-            print("\n✅ Dependencies installed! Please restart the script.")
-            sys.exit(0)
-        else:
-            print("\n❌ Missing dependencies. Exiting...")
-            sys.exit(1)
-
-# Run dependency check before importing other modules
-check_dependencies()
-
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify
+import csv
+import io
+import json
+import os
 import sqlite3
-import bcrypt
 from datetime import datetime
-import pytz
 
-app = Flask(__name__)
-app.secret_key = "super_secret_key"
+from flask import (Flask, Response, current_app, render_template, request, redirect, url_for, session, jsonify,
+                   make_response, send_file, stream_with_context)
+
+from database.connection import configure_pool, get_db, get_pool, init_app as init_db
+from database.migrations import migrate
+from utils import alerts, api, images, inventory, metrics, reports, transactions
+from utils.auth import ensure_default_admin, login_admin
+from utils.badge_cache import badge_cache
+from utils.events import event_log
+from utils.images import image_cache
+from utils.kiosk import kiosk_registry
+from utils.settings import settings_cache
+
+# Overridden by the file named in TOOL_CONFIG, then by TOOL_* environment
+# variables (e.g. TOOL_DATABASE, TOOL_SECRET_KEY), then by create_app(config).
+DEFAULT_CONFIG = {
+    "DATABASE": "tool_management.db",
+    "DB_POOL_SIZE": 8,
+    "SECRET_KEY": "super_secret_key",
+    "TIMEZONE": "America/New_York",
+    "ALERT_INTERVAL": 60,  # seconds; 0 disables the overdue/low-stock checker
+    "ALERT_SINKS": ["file:alerts.log"],
+    "METRICS": True,
+    "METRICS_ALLOWED_IPS": ["127.0.0.1", "::1"],
+    "SLOW_QUERY_MS": 0,  # log statements slower than this; 0 disables
+    "PROFILE_DIR": None,  # write a cProfile dump per request here; off by default
+    "IMAGE_DIR": "tool_images",
+    "IMAGE_THUMBNAIL_SIZE": 320,  # pixels, longest side
+    "EVENTS_MAX_WAITERS": 4,  # /events long-polls that may wait at once in one worker
+}
+
+# Image names are content hashes, so the bytes behind a URL never change.
+IMAGE_MAX_AGE = 365 * 24 * 3600
+
+# Views are collected here and attached by create_app. A blueprint would
+# prefix every endpoint name and break the url_for calls in the templates.
+ROUTES = []
+
+def route(rule, **options):
+    def decorator(view):
+        ROUTES.append((rule, view, options))
+        return view
+    return decorator
+
+def load_config(app, config=None):
+    """Layer defaults, the TOOL_CONFIG file, TOOL_* env vars and `config`."""
+    app.config.from_mapping(DEFAULT_CONFIG)
+    config_file = os.environ.get("TOOL_CONFIG")
+    if config_file:
+        if config_file.endswith(".json"):
+            app.config.from_file(os.path.abspath(config_file), load=json.load)
+        else:
+            app.config.from_pyfile(os.path.abspath(config_file))
+    app.config.from_prefixed_env("TOOL")
+    if config:
+        app.config.from_mapping(config)
+
+def create_app(config=None):
+    """Build the app: load config, open the pool and bring the schema up to date."""
+    app = Flask(__name__)
+    load_config(app, config)
+
+    transactions.configure_timezone(app.config["TIMEZONE"])
+    images.configure(app.config["IMAGE_DIR"], app.config["IMAGE_THUMBNAIL_SIZE"])
+    event_log.configure(app.config["EVENTS_MAX_WAITERS"])
+    metrics.init_app(app)
+    configure_pool(app.config["DATABASE"], app.config["DB_POOL_SIZE"])
+    init_db(app)
+
+    for rule, view, options in ROUTES:
+        app.add_url_rule(rule, view_func=view, **options)
+    app.context_processor(inject_settings)
+
+    with app.app_context():
+        migrate(get_db())
+        ensure_default_admin(get_db())
+    return app
+
+def warm_caches(app):
+    """Load badges, settings and tool images up front so the first kiosk tap is a cache hit."""
+    with app.app_context():
+        badge_cache.warm(get_db())
+        settings_cache.load(get_db())
+        image_cache.warm(get_db())
+
+def start_alert_scheduler(app):
+    """Run the alert checker in this process; call once per worker, after forking."""
+    if app.config["ALERT_INTERVAL"] > 0:
+        sinks = [alerts.build_sink(spec) for spec in app.config["ALERT_SINKS"]]
+        alerts.alert_scheduler.configure(sinks, app.config["ALERT_INTERVAL"]).start()
+
+def inject_settings():
+    """Expose kiosk settings to every template from the in-memory cache."""
+    current = settings_cache.all(get_db())
+    return {"logout_time": current["auto_logout_time"], "auto_submit_length": current["auto_submit_length"]}
+
+# The session is cleared at every badge scan, so the room a kiosk stands in
+# is remembered in its own long-lived cookie.
+KIOSK_ROOM_COOKIE = "kiosk_room"
+KIOSK_ROOM_MAX_AGE = 365 * 24 * 3600
+
+def selected_room():
+    """Room chosen on the kiosk form, else the one this kiosk last used (None: any room)."""
+    if request.method == "POST":
+        return request.form.get("room_id", type=int)
+    return request.cookies.get(KIOSK_ROOM_COOKIE, type=int)
+
+def remember_room(response, room_id):
+    if room_id is None:
+        response.delete_cookie(KIOSK_ROOM_COOKIE)
+    else:
+        response.set_cookie(KIOSK_ROOM_COOKIE, str(room_id), max_age=KIOSK_ROOM_MAX_AGE, samesite="Lax")
+    return response
 
-DB_NAME = "tool_management.db"
-DEFAULT_AUTO_LOGOUT_TIME = 60
-DEFAULT_AUTO_SUBMIT_LENGTH = 6
-TIMEZONE = pytz.timezone("America/New_York")
+def image_url(image):
+    """URL for a stored image name; legacy free-text values pass through."""
+    return url_for("tool_image", name=image) if images.STORED_NAME.fullmatch(image) else image
 
-def get_db_connection():
-    """Connect to SQLite database and enable foreign keys."""
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")
-    return conn
+def confirmation_image(result):
+    """Thumbnail URL of the tool a checkout or return just handled, if it has one."""
+    paths = image_cache.lookup(get_db(), result["tool_id"]) if "tool_id" in result else None
+    return image_url(paths[1]) if paths else None
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD query parameter (ValueError makes Flask ignore it)."""
+    return datetime.strptime(value, "%Y-%m-%d").date()
 
 # ---------------- HOME PAGE ----------------
-@app.route("/")
+@route("/")
 def dashboard():
     """Redirect users to RFID verification."""
     return redirect(url_for("verify_rfid"))
 
 # ---------------- RFID VERIFICATION ----------------
-@app.route("/verify_rfid", methods=["GET", "POST"])
+@route("/verify_rfid", methods=["GET", "POST"])
 def verify_rfid():
     """Handles RFID verification for users and admins."""
-    session.clear()
+    if session:
+        session.clear()
 
     if request.method == "POST":
         user_rfid = request.form.get("rfid")
 
-        conn = get_db_connection()
-        try:
-            user = conn.execute("SELECT id, name, role FROM users WHERE rfid_tag = ?", (user_rfid,)).fetchone()
-        finally:
-            conn.close()
+        user = badge_cache.lookup(get_db(), user_rfid)
 
         if user:
-            session["user_id"] = user["id"]
-            session["user_name"] = user["name"]
-            session["role"] = user["role"]
+            session["user_id"] = user.id
+            session["user_name"] = user.name
+            session["role"] = user.role
             session["rfid"] = user_rfid
 
-            if user["role"] == "admin":
+            if user.role == "admin":
                 return redirect(url_for("admin_panel"))
             else:
                 return redirect(url_for("checkout_return"))
@@ -87,63 +166,110 @@ def verify_rfid():
     return render_template("verify_rfid.html")
 
 # ---------------- CHECKOUT RETURN PAGE ----------------
-@app.route("/checkout_return")
+@route("/checkout_return")
 def checkout_return():
     """Page where users select whether to check out or return tools."""
     if "user_id" not in session:
         return redirect(url_for("verify_rfid"))
 
-    logout_time = DEFAULT_AUTO_LOGOUT_TIME  # Default timeout
-
-    # Retrieve logout time from settings if stored in the database
-    conn = get_db_connection()
-    setting = conn.execute("SELECT value FROM settings WHERE key = 'auto_logout_time'").fetchone()
-    conn.close()
-
-    if setting:
-        logout_time = int(setting["value"])
-
-    return render_template("checkout_return.html", user_name=session["user_name"], logout_time=logout_time)
+    return render_template("checkout_return.html", user_name=session["user_name"])
 
 
 # ---------------- CHECKOUT TOOL ----------------
-@app.route("/checkout", methods=["GET", "POST"])
+@route("/checkout", methods=["GET", "POST"])
 def checkout():
     """Handles tool checkout."""
     if "user_id" not in session:
         return redirect(url_for("verify_rfid"))
 
-    return render_template("checkout.html", user_name=session["user_name"])
+    conn = get_db()
+    room_id = selected_room()
+    result = {}
+    if request.method == "POST":
+        barcode = request.form.get("barcode", "").strip()
+        result = transactions.checkout_tool(conn, session["user_id"], barcode, room_id)
+
+    response = make_response(render_template("checkout.html", user_name=session["user_name"],
+                                             message=result.get("message"), error=result.get("error"),
+                                             image_url=confirmation_image(result),
+                                             rooms=inventory.list_rooms(conn), room_id=room_id))
+    return remember_room(response, room_id)
+
+# ---------------- BASKET CHECKOUT ----------------
+@route("/checkout_basket", methods=["POST"])
+def checkout_basket():
+    """Checks out every tool scanned into the kiosk basket in one transaction."""
+    if "user_id" not in session:
+        return jsonify({"error": "Session expired"}), 401
+
+    payload = request.get_json(silent=True) or {}
+    barcodes = payload.get("barcodes", request.form.getlist("barcodes"))
+    if not isinstance(barcodes, list) or not all(isinstance(b, str) for b in barcodes):
+        return jsonify({"error": "barcodes must be a list of strings"}), 400
+    room_id = payload.get("room_id", request.form.get("room_id", type=int))
+    if room_id is not None and not isinstance(room_id, int):
+        return jsonify({"error": "room_id must be an integer"}), 400
+
+    result = transactions.checkout_basket(get_db(), session["user_id"], barcodes, room_id)
+    if not result["items"]:
+        return jsonify(result), 400
+    return remember_room(jsonify(result), room_id)
+
+# ---------------- HARDWARE READER EVENTS ----------------
+@route("/hardware/events", methods=["POST"])
+def hardware_events():
+    """Receives debounced scan batches from hardware/reader_service.py."""
+    if request.remote_addr not in ("127.0.0.1", "::1"):
+        return jsonify({"error": "Reader events are only accepted from this machine"}), 403
+
+    payload = request.get_json(silent=True) or {}
+    kiosk = payload.get("kiosk")
+    events = payload.get("events")
+    room_id = payload.get("room_id")
+    if not isinstance(kiosk, str) or not isinstance(events, list) or not all(isinstance(e, dict) for e in events):
+        return jsonify({"error": "Expected {\"kiosk\": str, \"events\": [...]}"}), 400
+    if room_id is not None and not isinstance(room_id, int):
+        return jsonify({"error": "room_id must be an integer"}), 400
+
+    conn = get_db()
+    timeout = settings_cache.get(conn, "auto_logout_time")
+    return jsonify({"results": kiosk_registry.handle_events(conn, kiosk, events, timeout, room_id)})
 
 # ---------------- RETURN TOOL ----------------
-@app.route("/return_tool", methods=["GET", "POST"])
+@route("/return_tool", methods=["GET", "POST"])
 def return_tool():
     """Handles returning a tool and increasing its quantity."""
     if "user_id" not in session:
         return redirect(url_for("verify_rfid"))
 
-    return render_template("return_tool.html", user_name=session["user_name"])
+    conn = get_db()
+    room_id = selected_room()
+    result = {}
+    if request.method == "POST":
+        barcode = request.form.get("barcode", "").strip()
+        result = transactions.return_tool(conn, session["user_id"], barcode, room_id)
+
+    response = make_response(render_template("return_tool.html", user_name=session["user_name"],
+                                             message=result.get("message"), error=result.get("error"),
+                                             image_url=confirmation_image(result),
+                                             rooms=inventory.list_rooms(conn), room_id=room_id))
+    return remember_room(response, room_id)
 
 # ---------------- ADMIN PANEL ----------------
-@app.route("/admin")
+@route("/admin")
 def admin_panel():
     """Render the admin panel."""
     if "role" not in session or session["role"] != "admin":
         return "Unauthorized", 403
 
-    conn = get_db_connection()
-    try:
-        users = conn.execute("SELECT id, name, rfid_tag, role FROM users").fetchall()
-        tools = conn.execute("SELECT id, name, barcode, quantity, image FROM tools").fetchall()
-        rooms = conn.execute("SELECT id, name FROM rooms").fetchall()
-        settings = conn.execute("SELECT key, value FROM settings").fetchall()
-    finally:
-        conn.close()
-
-    return render_template("admin.html", users=users, tools=tools, rooms=rooms, settings=settings)
+    # Users, tools and rooms are loaded page by page from /api/* by admin.js
+    conn = get_db()
+    return render_template("admin.html", settings=settings_cache.all(conn), rooms=inventory.list_rooms(conn),
+                           active_alerts=alerts.active_alerts(conn), resolved_alerts=alerts.recently_resolved(conn),
+                           alert_scheduler=alerts.alert_scheduler)
 
 # ---------------- ADD USER ----------------
-@app.route("/add_user", methods=["POST"])
+@route("/add_user", methods=["POST"])
 def add_user():
     """Allows an admin to add a new user."""
     if "role" not in session or session["role"] != "admin":
@@ -153,15 +279,15 @@ def add_user():
     rfid_tag = request.form["rfid_tag"]
     role = request.form["role"]
 
-    conn = get_db_connection()
+    conn = get_db()
     conn.execute("INSERT INTO users (name, rfid_tag, role) VALUES (?, ?, ?)", (name, rfid_tag, role))
+    badge_cache.invalidate(conn)
     conn.commit()
-    conn.close()
 
     return redirect(url_for("admin_panel"))
 
 # ---------------- DELETE USER ----------------
-@app.route("/delete_user", methods=["POST"])
+@route("/delete_user", methods=["POST"])
 def delete_user():
     """Allows an admin to delete a user."""
     if "role" not in session or session["role"] != "admin":
@@ -170,15 +296,15 @@ def delete_user():
     user_id = request.form.get("user_id")
 
     if user_id:
-        conn = get_db_connection()
+        conn = get_db()
         conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
+        badge_cache.invalidate(conn)
         conn.commit()
-        conn.close()
 
     return redirect(url_for("admin_panel"))
 
 # ---------------- ADD TOOL ----------------
-@app.route("/add_tool", methods=["POST"])
+@route("/add_tool", methods=["POST"])
 def add_tool():
     """Allows an admin to add a new tool."""
     if "role" not in session or session["role"] != "admin":
@@ -186,19 +312,87 @@ def add_tool():
 
     name = request.form["name"]
     barcode = request.form["barcode"]
-    quantity = request.form["quantity"]
-    image = request.form["image"]
+    quantity = request.form.get("quantity", type=int)
+    image = request.form.get("image") or None
+    if quantity is None or quantity < 0:
+        return "Quantity must be a whole number of 0 or more", 400
+
+    upload = request.files.get("image_file")
+    if upload is not None and upload.filename:
+        stored = images.save_upload(upload.stream)
+        if "error" in stored:
+            return stored["error"], 400
+        image = stored["name"]
+
+    conn = get_db()
+    try:
+        tool_id = conn.execute("INSERT INTO tools (name, barcode, quantity, image) VALUES (?, ?, ?, ?)",
+                               (name, barcode, quantity, image)).lastrowid
+        if image:
+            image_cache.invalidate(conn)
+        event_log.publish(conn, "quantity", {"tool_id": tool_id, "tool_name": name, "quantity": quantity})
+        conn.commit()
+    except Exception as exc:
+        # Whatever failed, a photo stored for this tool must not be left behind.
+        conn.rollback()
+        if upload is not None and upload.filename:
+            images.discard(conn, image)
+        if isinstance(exc, sqlite3.IntegrityError) and "UNIQUE constraint failed: tools.barcode" in str(exc):
+            return "Barcode already exists", 400
+        raise
+
+    return redirect(url_for("admin_panel"))
+
+# ---------------- TOOL IMAGES ----------------
+@route("/upload_tool_image", methods=["POST"])
+def upload_tool_image():
+    """Stores a photo for an existing tool and makes its thumbnail."""
+    if "role" not in session or session["role"] != "admin":
+        return "Unauthorized", 403
+
+    tool_id = request.form.get("tool_id", type=int)
+    upload = request.files.get("image")
+    if tool_id is None or upload is None or not upload.filename:
+        return jsonify({"error": "Choose a tool and an image"}), 400
 
-    conn = get_db_connection()
-    conn.execute("INSERT INTO tools (name, barcode, quantity, image) VALUES (?, ?, ?, ?)", 
-                 (name, barcode, quantity, image))
+    stored = images.save_upload(upload.stream)
+    if "error" in stored:
+        return jsonify(stored), 400
+
+    conn = get_db()
+    if not conn.execute("UPDATE tools SET image = ? WHERE id = ?", (stored["name"], tool_id)).rowcount:
+        conn.rollback()
+        return jsonify({"error": "Unknown tool"}), 404
+    image_cache.invalidate(conn)
     conn.commit()
-    conn.close()
 
-    return redirect(url_for("admin_panel"))
+    full, thumbnail = images.resolve(stored["name"])
+    return jsonify({"message": stored["message"], "image_url": image_url(thumbnail), "full_image_url": image_url(full)})
+
+@route("/images/<name>")
+def tool_image(name):
+    """Serves a stored image or thumbnail; names are content hashes, so cache forever."""
+    path = images.locate(name)
+    if path is None:
+        return "Not found", 404
+    response = send_file(path, max_age=IMAGE_MAX_AGE, etag=name.split(".")[0], conditional=True)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@route("/get_tool_image/<int:tool_id>")
+def get_tool_image(tool_id):
+    """Thumbnail and full-size URLs for a tool, from the in-memory id -> image map."""
+    paths = image_cache.lookup(get_db(), tool_id)
+    response = jsonify({"tool_id": tool_id, "image_url": image_url(paths[1]) if paths else None,
+                        "full_image_url": image_url(paths[0]) if paths else None})
+    # Revalidated each time, but a changed photo is the only thing that misses the 304.
+    response.cache_control.no_cache = True
+    response.add_etag()
+    return response.make_conditional(request)
 
 # ---------------- ADD ROOM ----------------
-@app.route("/add_room", methods=["POST"])
+@route("/add_room", methods=["POST"])
 def add_room():
     """Allows an admin to add a room for checkout tracking."""
     if "role" not in session or session["role"] != "admin":
@@ -206,15 +400,74 @@ def add_room():
 
     room_name = request.form["room_name"]
 
-    conn = get_db_connection()
+    conn = get_db()
     conn.execute("INSERT INTO rooms (name) VALUES (?)", (room_name,))
     conn.commit()
-    conn.close()
 
     return redirect(url_for("admin_panel"))
 
+# ---------------- TRANSFER STOCK ----------------
+@route("/transfer_stock", methods=["POST"])
+def transfer_stock():
+    """Moves units of a tool from one room to another."""
+    if "role" not in session or session["role"] != "admin":
+        return "Unauthorized", 403
+
+    barcode = request.form.get("barcode", "").strip()
+    from_room = request.form.get("from_room", type=int)
+    to_room = request.form.get("to_room", type=int)
+    quantity = request.form.get("quantity", type=int)
+    if from_room is None or to_room is None:
+        return jsonify({"error": "Choose both rooms"}), 400
+    if quantity is None:
+        return jsonify({"error": "Quantity must be a whole number"}), 400
+
+    result = inventory.transfer_stock(get_db(), barcode, from_room, to_room, quantity)
+    return jsonify(result), 400 if "error" in result else 200
+
+# ---------------- BULK IMPORT / EXPORT ----------------
+@route("/import/<table>", methods=["POST"])
+def bulk_import(table):
+    """Imports an uploaded CSV or JSON file of users, tools or rooms."""
+    if "role" not in session or session["role"] != "admin":
+        return "Unauthorized", 403
+    from utils import bulk
+    if table not in bulk.IMPORT_SPECS:
+        return jsonify({"error": f"Cannot import {table}"}), 404
+
+    upload = request.files.get("file")
+    if upload is None or not upload.filename:
+        return jsonify({"error": "No file uploaded"}), 400
+
+    fmt = request.form.get("format") or ("csv" if upload.filename.lower().endswith(".csv") else "json")
+    stream = io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline="")
+    try:
+        result = bulk.import_rows(get_db(), table, bulk.iter_rows(stream, fmt))
+    except (ValueError, UnicodeDecodeError, csv.Error) as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    return jsonify(result)
+
+@route("/export/<table>")
+def bulk_export(table):
+    """Streams a table as CSV or NDJSON without loading it into memory."""
+    if "role" not in session or session["role"] != "admin":
+        return "Unauthorized", 403
+    from utils import bulk
+    if table not in bulk.EXPORT_QUERIES:
+        return jsonify({"error": f"Cannot export {table}"}), 404
+
+    fmt = request.args.get("format", "csv")
+    if fmt not in ("csv", "ndjson"):
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    response = Response(stream_with_context(bulk.export_rows(get_db(), table, fmt)), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f"attachment; filename={table}.{fmt}"
+    return response
+
 # ---------------- UPDATE ADMIN SETTINGS ----------------
-@app.route("/update_settings", methods=["POST"])
+@route("/update_settings", methods=["POST"])
 def update_settings():
     """Updates admin settings like auto-logout time."""
     if "role" not in session or session["role"] != "admin":
@@ -222,97 +475,202 @@ def update_settings():
 
     logout_time = request.form.get("logout_time", type=int)
     submit_length = request.form.get("submit_length", type=int)
+    overdue_hours = request.form.get("overdue_hours", type=int)
+    low_stock_threshold = request.form.get("low_stock_threshold", type=int)
 
-    conn = get_db_connection()
-    conn.execute("UPDATE settings SET value=? WHERE key='auto_logout_time'", (logout_time,))
-    conn.execute("UPDATE settings SET value=? WHERE key='auto_submit_length'", (submit_length,))
-    conn.commit()
-    conn.close()
+    settings_cache.update(get_db(), auto_logout_time=logout_time, auto_submit_length=submit_length,
+                          overdue_hours=overdue_hours, low_stock_threshold=low_stock_threshold)
 
     return redirect(url_for("admin_panel"))
 
 
-@app.route('/api/tools', methods=['GET'])
+# ---------------- LIVE EVENTS ----------------
+@route("/events")
+def events():
+    """Long-poll for checkouts, returns and stock changes newer than ?after=<id>."""
+    # Not get_db(): the request's connection would be held for the whole wait.
+    response = jsonify(event_log.poll(get_pool(), request.args.get("after", type=int)))
+    response.cache_control.no_store = True
+    return response
+
+# ---------------- METRICS ----------------
+@route("/metrics")
+def prometheus_metrics():
+    """Prometheus scrape endpoint for this worker's request and query timings."""
+    if not current_app.config["METRICS"]:
+        return "Metrics are disabled", 404
+    if request.remote_addr not in current_app.config["METRICS_ALLOWED_IPS"] and session.get("role") != "admin":
+        return "Forbidden", 403
+
+    extra = [
+        "# HELP tool_event_waiters /events long-polls waiting in this worker.",
+        "# TYPE tool_event_waiters gauge",
+        f"tool_event_waiters {len(event_log)}",
+    ]
+    return Response(metrics.render() + "\n".join(extra) + "\n", mimetype="text/plain; version=0.0.4")
+
+# ---------------- JSON API ----------------
+def api_listing(resource):
+    """Serve one keyset page of a resource, or stream it as NDJSON (admins only)."""
+    streaming = request.args.get("format") == "ndjson"
+    admin = session.get("role") == "admin"
+    try:
+        after, limit, fields, columns = api.parse_page_args(request.args, resource, streaming, admin)
+    except api.ApiForbidden as exc:
+        return jsonify({"error": str(exc)}), 403
+    except api.ApiError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    query = request.args.get("q", "").strip()
+    cursor = api.select_page(get_db(), resource, after, limit, columns, query)
+    if streaming:
+        return Response(stream_with_context(api.iter_ndjson(cursor, fields)), mimetype="application/x-ndjson")
+
+    rows = cursor.fetchall()
+    response = jsonify([api.row_to_dict(row, fields) for row in rows])
+    if len(rows) == limit:
+        next_url = url_for(request.endpoint, **request.view_args, after=rows[-1]["id"], limit=limit,
+                           fields=request.args.get("fields"), q=query or None)
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+
+    # Polling dashboards send If-None-Match and get a 304 while nothing changed.
+    response.add_etag()
+    return response.make_conditional(request)
+
+@route('/api/tools', methods=['GET'])
 def api_get_tools():
-    tools = Tool.query.all()
-    return jsonify([
-        {'id': tool.id, 'name': tool.name, 'quantity': tool.quantity}
-        for tool in tools
-    ])
+    return api_listing("tools")
 
-@app.route('/api/users', methods=['GET'])
+@route('/api/users', methods=['GET'])
 def api_get_users():
-    users = User.query.all()
-    return jsonify([
-        {'id': user.id, 'name': user.name, 'rfid': user.rfid_tag}
-        for user in users
-    ])
+    return api_listing("users")
 
-@app.route('/api/rooms', methods=['GET'])
+@route('/api/rooms', methods=['GET'])
 def api_get_rooms():
-    rooms = Room.query.all()
-    return jsonify([
-        {'id': room.id, 'name': room.name, 'description': room.description}
-        for room in rooms
-    ])
+    return api_listing("rooms")
 
-@app.route('/api/checkedout', methods=['GET'])
+@route('/api/checkedout', methods=['GET'])
 def api_get_checkedout():
-    checked_out_items = CheckedOutTool.query.all()
-    return jsonify([
-        {
-            'id': item.id,
-            'tool_name': item.tool.name,
-            'user_name': item.user.name,
-            'checkout_date': item.checkout_date.strftime('%Y-%m-%d %H:%M:%S')
-        }
-        for item in checked_out_items
-    ])
-
-
-@app.route('/manage_tools')
+    return api_listing("checkedout")
+
+# The admin panel tabs page through these; /api/* above serves kiosk pages
+# and other non-admin callers their public fields only.
+@route("/admin/api/<resource>")
+def admin_api_listing(resource):
+    """One page of users, tools, rooms or checked-out tools for the admin panel."""
+    if "role" not in session or session["role"] != "admin":
+        return jsonify({"error": "Admin login required"}), 403
+    if resource not in api.RESOURCES:
+        return jsonify({"error": f"Unknown resource {resource}"}), 404
+    return api_listing(resource)
+
+@route('/api/availability', methods=['GET'])
+def api_availability():
+    """Rooms with a free unit of a tool, looked up by barcode or tool_id."""
+    if "role" not in session or session["role"] != "admin":
+        return jsonify({"error": "Admin login required"}), 403
+
+    barcode = request.args.get("barcode", "").strip()
+    tool_id = request.args.get("tool_id", type=int)
+    if not barcode and tool_id is None:
+        return jsonify({"error": "Pass barcode or tool_id"}), 400
+
+    found = inventory.find_available(get_db(), barcode=barcode or None, tool_id=tool_id)
+    if found is None:
+        return jsonify({"error": "Unknown tool"}), 404
+    return jsonify(found)
+
+
+@route('/manage_tools')
 def manage_tools():
     return render_template('manage_tools.html')
 
-@app.route('/checked_out_tools')
+@route('/checked_out_tools')
 def checked_out_tools():
     return render_template('checked_out_tools.html')
 
-@app.route('/manage_rooms')
+@route('/manage_rooms')
 def manage_rooms():
     return render_template('manage_rooms.html')
 
-@app.route('/add_users')
+@route('/add_users')
 def add_users():
+    # Lists badge tags, so it is for admins only
+    if "role" not in session or session["role"] != "admin":
+        return redirect(url_for("login"))
     return render_template('add_users.html')
 
 
+# ---------------- ADMIN LOGIN ----------------
+@route("/login", methods=["GET", "POST"])
+def login():
+    """Password login for admins; bcrypt runs off the request thread."""
+    error = None
+    if request.method == "POST":
+        result = login_admin(request.form.get("username", "").strip(), request.form.get("password", ""))
+        if "admin" in result:
+            session.clear()
+            session["role"] = "admin"
+            session["admin_id"] = result["admin"]["id"]
+            session["user_name"] = result["admin"]["username"]
+            return redirect(url_for("admin_panel"))
+        error = result["error"]
+
+    return render_template("login.html", error=error)
+
 # ---------------- LOGOUT ----------------
-@app.route('/logout')
+@route('/logout')
 def logout():
     session.clear()  # Clears the session
     return redirect(url_for('verify_rfid'))
 
 # ---------------- LOGS PAGE ----------------
-@app.route("/logs")
+@route("/logs")
 def logs():
     """Display transaction logs of tool checkouts and returns."""
     if "role" not in session or session["role"] != "admin":
         return redirect(url_for("login"))
 
-    conn = get_db_connection()
-    logs = conn.execute("""
-        SELECT transactions.id, users.name AS user_name, tools.name AS tool_name, 
-               transactions.checkout_time, transactions.return_time
-        FROM transactions
-        JOIN users ON transactions.user_id = users.id
-        JOIN tools ON transactions.tool_id = tools.id
-        ORDER BY transactions.checkout_time DESC
-    """).fetchall()
-    conn.close()
+    filters = {
+        "user_id": request.args.get("user_id", type=int),
+        "tool_id": request.args.get("tool_id", type=int),
+        "start_date": request.args.get("start", type=parse_date),
+        "end_date": request.args.get("end", type=parse_date),
+        "open_only": request.args.get("open") == "1",
+    }
+
+    before = None
+    before_time = request.args.get("before_time")
+    before_id = request.args.get("before_id", type=int)
+    if before_time and before_id is not None:
+        before = (before_time, before_id)
+
+    logs, next_cursor = transactions.get_log_page(get_db(), before=before, **filters)
+
+    next_url = None
+    if next_cursor:
+        query = {key: value for key, value in request.args.items() if key not in ("before_time", "before_id")}
+        next_url = url_for("logs", before_time=next_cursor[0], before_id=next_cursor[1], **query)
+
+    return render_template("logs.html", logs=logs, next_url=next_url, filters=request.args)
+
+# ---------------- USAGE REPORTS ----------------
+@route("/reports")
+def usage_reports():
+    """Utilization, overdue tools, top borrowers and peak hours from the rollups."""
+    if "role" not in session or session["role"] != "admin":
+        return redirect(url_for("login"))
 
-    return render_template("logs.html", logs=logs)
+    conn = get_db()
+    overdue_hours = settings_cache.get(conn, "overdue_hours")
+    report = reports.build_report(conn, request.args.get("start", type=parse_date),
+                                  request.args.get("end", type=parse_date), overdue_hours)
+    return render_template("reports.html", report=report, overdue_hours=overdue_hours)
 
 # ---------------- RUN FLASK APP ----------------
 if __name__ == "__main__":
+    # Development server only; production runs wsgi.py under gunicorn.
+    app = create_app()
+    warm_caches(app)
+    start_alert_scheduler(app)
     app.run(debug=True)
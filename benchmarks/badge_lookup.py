@@ -0,0 +1,78 @@
+"""Microbenchmark: cached vs. uncached RFID badge tap latency.
+
+    python -m benchmarks.badge_lookup --users 5000 --taps 20000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from database.connection import ConnectionPool
+from database.db_setup import initialize_database
+from utils.badge_cache import BadgeCache
+
+
+def seed(conn, users):
+    conn.executemany(
+        "INSERT INTO users (name, rfid_tag, role) VALUES (?, ?, 'user')",
+        [(f"User {i}", f"{i:06d}") for i in range(users)],
+    )
+    conn.commit()
+
+
+def time_taps(lookup, tags):
+    samples = []
+    for tag in tags:
+        started = time.perf_counter()
+        lookup(tag)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def report(label, samples):
+    samples = sorted(samples)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"{label:<10} mean={statistics.mean(samples) * 1e6:8.1f}us "
+          f"p50={statistics.median(samples) * 1e6:8.1f}us p99={p99 * 1e6:8.1f}us")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--taps", type=int, default=20000)
+    parser.add_argument("--max-size", type=int, default=None, help="cache bound (default: whole roster)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "badges.db")
+        initialize_database(db_name)
+        pool = ConnectionPool(db_name, size=1)
+        conn = pool.acquire()
+        seed(conn, args.users)
+
+        rng = random.Random(42)
+        # A tenth of the taps are unknown badges, as happens with visitor cards.
+        tags = [f"{rng.randrange(int(args.users * 1.1)):06d}" for _ in range(args.taps)]
+
+        def uncached(tag):
+            return conn.execute("SELECT id, name, role FROM users WHERE rfid_tag = ?", (tag,)).fetchone()
+
+        cache = BadgeCache(max_size=args.max_size or args.users)
+        cache.warm(conn)
+
+        def cached(tag):
+            return cache.lookup(conn, tag)
+
+        report("uncached", time_taps(uncached, tags))
+        report("cached", time_taps(cached, tags))
+
+        pool.release(conn)
+        pool.close_all()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
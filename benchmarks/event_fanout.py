@@ -0,0 +1,196 @@
+"""Benchmark: /events long-poll fan-out through a real gunicorn server.
+
+Starts gunicorn (gthread, --workers x --threads) on a freshly seeded
+database, or drives --url. --clients pollers long-poll /events the way the
+admin and checked-out pages do, while a kiosk checks a tool out and back in
+at --rate and a probe times GET /verify_rfid.
+
+The probe must stay fast however many pollers are open, and every poller
+must see every event, whichever worker handled the checkout.
+
+    python -m benchmarks.event_fanout --clients 64 --workers 2 --threads 8
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.shift_change import HttpTransport, ROOT, summarize
+
+BADGE = "FANOUT01"
+BARCODE = "FANOUT-TOOL"
+
+
+def prepare_database(db_name):
+    """Migrate db_name and add one kiosk user and one tool."""
+    from app import create_app
+    from database.connection import get_db, get_pool
+
+    application = create_app({"DATABASE": db_name, "ALERT_INTERVAL": 0, "IMAGE_DIR": os.path.dirname(db_name)})
+    with application.app_context():
+        conn = get_db()
+        conn.execute("INSERT INTO users (name, rfid_tag, role) VALUES ('Fan-out Kiosk', ?, 'user')", (BADGE,))
+        conn.execute("INSERT INTO tools (name, barcode, quantity) VALUES ('Fan-out Tool', ?, 1)", (BARCODE,))
+        conn.commit()
+    get_pool().close_all()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(db_name, workers, threads, max_waiters):
+    port = free_port()
+    env = dict(os.environ, TOOL_DATABASE=db_name, TOOL_ALERT_INTERVAL="0",
+               TOOL_IMAGE_DIR=os.path.dirname(db_name), TOOL_EVENTS_MAX_WAITERS=str(max_waiters))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "wsgi:application", "-c", "gunicorn.conf.py",
+         "--workers", str(workers), "--threads", str(threads), "--bind", f"127.0.0.1:{port}",
+         "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            HttpTransport(url).send("GET", "/verify_rfid")
+            return process, url
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("gunicorn did not start")
+
+
+def poller(url, stop, received, retries):
+    """Long-poll from the start of the log, recording when each event id arrives."""
+    transport = HttpTransport(url)
+    after = 0
+    while not stop.is_set():
+        try:
+            status, body = transport.send("GET", f"/events?after={after}")
+        except OSError:
+            continue
+        now = time.perf_counter()
+        result = json.loads(body)
+        for event in result["events"]:
+            received[event["id"]] = now
+        after = result["last_id"]
+        if result.get("retry"):
+            retries.append(now)
+            stop.wait(result["retry"])
+    transport.close()
+
+
+def publisher(url, count, rate, published, failures):
+    """Check the tool out and back in; event k is the k-th successful request."""
+    transport = HttpTransport(url)
+    try:
+        transport.send("POST", "/verify_rfid", {"rfid": BADGE})
+    except OSError:
+        failures.append("POST /verify_rfid")
+        return
+    started = time.perf_counter()
+    for i in range(count):
+        path = "/checkout" if i % 2 == 0 else "/return_tool"
+        try:
+            status, body = transport.send("POST", path, {"barcode": BARCODE})
+        except OSError:
+            # Every worker thread is stuck in a poll; the kiosk times out.
+            failures.append(f"POST {path}")
+            transport.close()
+            continue
+        if b"alert-success" in body:
+            published.append(time.perf_counter())
+        delay = started + (i + 1) / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    transport.close()
+
+
+def probe(url, stop, samples, interval=0.1):
+    """Time the kiosk badge page, which needs a free worker thread."""
+    transport = HttpTransport(url)
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            transport.send("GET", "/verify_rfid")
+        except OSError:
+            transport.close()
+        samples.append(time.perf_counter() - started)
+        stop.wait(interval)
+    transport.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=64, help="open pages long-polling /events")
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=20, help="checkouts and returns per second")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--max-waiters", type=int, default=4, help="EVENTS_MAX_WAITERS per worker")
+    parser.add_argument("--url", help="drive an already running server seeded by this script's --db")
+    parser.add_argument("--db", help="database file (default: a temporary one)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = args.db or os.path.join(tmp, "fanout.db")
+        server = None
+        url = args.url
+        if url is None:
+            prepare_database(db_name)
+            server, url = start_gunicorn(db_name, args.workers, args.threads, args.max_waiters)
+
+        try:
+            stop = threading.Event()
+            received = [{} for _ in range(args.clients)]
+            retries = []
+            probe_samples = []
+            published = []
+            failures = []
+            threads = [threading.Thread(target=poller, args=(url, stop, received[i], retries), daemon=True)
+                       for i in range(args.clients)]
+            threads.append(threading.Thread(target=probe, args=(url, stop, probe_samples), daemon=True))
+            for thread in threads:
+                thread.start()
+            time.sleep(1)  # Let the pollers settle into their waits
+
+            started = time.perf_counter()
+            publisher(url, args.events, args.rate, published, failures)
+            # Pollers sent away with "retry" come back within a few seconds.
+            deadline = time.perf_counter() + 15
+            while time.perf_counter() < deadline and any(len(got) < len(published) for got in received):
+                time.sleep(0.1)
+            elapsed = time.perf_counter() - started
+            stop.set()
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=15)
+
+    latencies = [got[index + 1] - sent for got in received for index, sent in enumerate(published)
+                 if index + 1 in got]
+    complete = sum(len(got) >= len(published) for got in received)
+    print(f"{args.clients} pollers, {len(published)} events in {elapsed:.1f}s "
+          f"({args.workers} workers x {args.threads} threads, {args.max_waiters} waiters each)")
+    if latencies:
+        stats = summarize(latencies)
+        print(f"delivery   p50={stats['p50_ms']:.0f}ms p99={stats['p99_ms']:.0f}ms max={stats['max_ms']:.0f}ms")
+    stats = summarize(probe_samples)
+    print(f"kiosk probe p50={stats['p50_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms max={stats['max_ms']:.1f}ms "
+          f"({stats['count']} requests)")
+    print(f"pollers with every event: {complete}/{args.clients}; retry responses: {len(retries)}")
+    if failures:
+        print(f"kiosk requests that timed out: {len(failures)} (first: {failures[0]})")
+    return 0 if complete == args.clients and not failures and stats["max_ms"] < 1000 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
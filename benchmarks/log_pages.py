@@ -0,0 +1,103 @@
+"""Benchmark: /logs page latency over a large transactions table.
+
+Seeds a synthetic history (1M transactions by default), then times the
+first page, a page reached by following the cursor deep into history, and
+each filter combination.
+
+    python -m benchmarks.log_pages --rows 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from database.connection import ConnectionPool
+from database.db_setup import initialize_database
+from utils.transactions import TIMEZONE, get_log_page
+
+
+def seed(conn, rows, users, tools):
+    rng = random.Random(7)
+    conn.executemany(
+        "INSERT INTO users (name, rfid_tag) VALUES (?, ?)",
+        ((f"User {i}", f"{i:06d}") for i in range(users)),
+    )
+    conn.executemany(
+        "INSERT INTO tools (name, barcode, quantity) VALUES (?, ?, 100)",
+        ((f"Tool {i}", f"T{i:06d}") for i in range(tools)),
+    )
+
+    start = TIMEZONE.localize(datetime(2025, 1, 1, 6))
+    step = timedelta(days=365) / rows
+
+    def history():
+        for i in range(rows):
+            checkout = start + step * i
+            # The most recent 2% are still out.
+            returned = None if i > rows * 0.98 else str(checkout + timedelta(hours=rng.randint(1, 48)))
+            yield (rng.randint(1, users), rng.randint(1, tools), str(checkout), returned)
+
+    conn.executemany(
+        "INSERT INTO transactions (user_id, tool_id, checkout_time, return_time) VALUES (?, ?, ?, ?)",
+        history(),
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--tools", type=int, default=20000)
+    parser.add_argument("--depth", type=int, default=200, help="pages to follow for the deep-page case")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "logs.db")
+        initialize_database(db_name)
+        pool = ConnectionPool(db_name, size=1)
+        conn = pool.acquire()
+
+        started = time.perf_counter()
+        seed(conn, args.rows, args.users, args.tools)
+        print(f"seeded {args.rows} transactions in {time.perf_counter() - started:.1f}s")
+
+        cursor = None
+        for _ in range(args.depth):
+            _, cursor = get_log_page(conn, before=cursor)
+
+        cases = {
+            "first page": {},
+            f"page {args.depth}": {"before": cursor},
+            "by user": {"user_id": args.users // 2},
+            "by tool": {"tool_id": args.tools // 2},
+            "open only": {"open_only": True},
+            "one week": {"start_date": date(2025, 6, 1), "end_date": date(2025, 6, 7)},
+            "user + open": {"user_id": args.users // 2, "open_only": True},
+        }
+        for label, filters in cases.items():
+            ms = timed(lambda: get_log_page(conn, **filters), args.repeat)
+            print(f"{label:<14} {ms:8.2f} ms")
+
+        pool.release(conn)
+        pool.close_all()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""Benchmark: concurrent admin logins and their effect on other requests.
+
+Logins hash on the bounded bcrypt pool in utils.auth. While they run, a
+probe thread does cheap work (a badge-style lookup) so you can see that
+password checks no longer stall everything else in the worker.
+
+    python -m benchmarks.login_throughput --threads 16 --logins 200 --rounds 10
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from database.connection import configure_pool, connection
+from database.db_setup import initialize_database
+from utils import auth
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[max(0, int(len(samples) * fraction) - 1)]
+
+
+def report(label, samples):
+    print(f"{label:<8} n={len(samples):<6} mean={statistics.mean(samples) * 1e3:8.2f}ms "
+          f"p50={statistics.median(samples) * 1e3:8.2f}ms p99={percentile(samples, 0.99) * 1e3:8.2f}ms")
+
+
+def probe(stop, samples):
+    """Time a cheap indexed lookup every few milliseconds until stopped."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        with connection() as conn:
+            conn.execute("SELECT id FROM users WHERE rfid_tag = ?", ("000000",)).fetchone()
+        samples.append(time.perf_counter() - started)
+        time.sleep(0.005)
+
+
+def run_probe(seconds):
+    stop, samples = threading.Event(), []
+    thread = threading.Thread(target=probe, args=(stop, samples))
+    thread.start()
+    time.sleep(seconds)
+    stop.set()
+    thread.join()
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16, help="concurrent login requests")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=auth.BCRYPT_ROUNDS, help="bcrypt cost factor")
+    parser.add_argument("--workers", type=int, default=auth.HASH_WORKERS, help="bcrypt pool size")
+    parser.add_argument("--wrong", type=float, default=0.0, help="fraction of logins with a bad password")
+    args = parser.parse_args(argv)
+
+    # Let every request queue for the pool instead of being refused as busy.
+    auth.configure_hashing(args.rounds, args.workers, max_pending=args.threads)
+    # Failed attempts would otherwise lock the account out mid-run.
+    auth.rate_limiter = auth.LoginRateLimiter(attempts=args.logins + 1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "logins.db")
+        initialize_database(db_name)
+        configure_pool(db_name, size=args.threads + 2)
+
+        username, password = auth.DEFAULT_ADMIN
+        bad_every = int(1 / args.wrong) if args.wrong else 0
+
+        def attempt(i):
+            guess = "wrong-password" if bad_every and i % bad_every == 0 else password
+            started = time.perf_counter()
+            result = auth.login_admin(username, guess)
+            return time.perf_counter() - started, "admin" in result
+
+        idle = run_probe(1.0)
+
+        stop, busy = threading.Event(), []
+        prober = threading.Thread(target=probe, args=(stop, busy))
+        prober.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as executor:
+            results = list(executor.map(attempt, range(args.logins)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        prober.join()
+
+    latencies = [latency for latency, _ in results]
+    succeeded = sum(ok for _, ok in results)
+    print(f"{args.logins} logins, {args.threads} threads, cost {args.rounds}, {args.workers} hash workers")
+    print(f"throughput {args.logins / elapsed:.1f} logins/s ({succeeded} succeeded)")
+    report("login", latencies)
+    report("probe", idle)
+    report("+login", busy)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
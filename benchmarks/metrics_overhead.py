@@ -0,0 +1,73 @@
+"""Benchmark: cost of request/query instrumentation on hot routes.
+
+Each configuration runs in a fresh interpreter (the query observer is
+process-wide) against its own copy of a small seeded database, and times
+the same requests through the Flask test client. Configurations are
+interleaved over several rounds and the best round is reported.
+
+    python -m benchmarks.metrics_overhead --requests 5000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONFIGS = {
+    "metrics off": {"METRICS": False},
+    "metrics on": {"METRICS": True},
+    "+ slow-query log": {"METRICS": True, "SLOW_QUERY_MS": 1000},
+}
+
+WORKLOAD = """
+import json, sys, time
+from app import create_app
+
+config, requests = json.loads(sys.argv[1]), int(sys.argv[2])
+app = create_app(dict(config, ALERT_INTERVAL=0))
+with app.app_context():
+    from database.connection import get_db
+    db = get_db()
+    db.executemany("INSERT OR IGNORE INTO tools (name, barcode, quantity) VALUES (?, ?, 5)",
+                   [(f"Tool {i}", f"B{i:05d}") for i in range(500)])
+    db.commit()
+
+client = app.test_client()
+paths = ["/verify_rfid", "/api/tools?limit=50", "/api/checkedout"]
+for path in paths:
+    client.get(path)
+started = time.perf_counter()
+for i in range(requests):
+    client.get(paths[i % len(paths)])
+print(time.perf_counter() - started)
+"""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    best = {label: float("inf") for label in CONFIGS}
+    with tempfile.TemporaryDirectory() as tmp:
+        for round_number in range(args.rounds):
+            for index, (label, config) in enumerate(CONFIGS.items()):
+                config = dict(config, DATABASE=os.path.join(tmp, f"{round_number}-{index}.db"))
+                result = subprocess.run(
+                    [sys.executable, "-c", WORKLOAD, json.dumps(config), str(args.requests)],
+                    cwd=ROOT, env=dict(os.environ, PYTHONPATH=ROOT), check=True, capture_output=True, text=True,
+                )
+                best[label] = min(best[label], float(result.stdout.split()[-1]))
+
+    baseline = best["metrics off"]
+    for label, seconds in best.items():
+        print(f"{label:<18} {seconds / args.requests * 1e6:8.1f} us/request  ({seconds / baseline - 1:+.1%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
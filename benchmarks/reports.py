@@ -0,0 +1,84 @@
+"""Benchmark: usage reports from rollup tables vs. scanning transactions.
+
+Seeds the same synthetic history as log_pages, times the one-off backfill
+refresh, an incremental refresh after a burst of new checkouts, and a
+report over a date range from the rollups next to the equivalent full-table query.
+
+    python -m benchmarks.reports --rows 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks.log_pages import seed, timed
+from database.connection import ConnectionPool
+from database.db_setup import initialize_database
+from utils import reports
+
+# What a dashboard would have to run without rollups: per-tool counts and
+# durations computed from every row in the range.
+FULL_SCAN = """
+    SELECT tool_id, COUNT(*) AS checkouts,
+           AVG((julianday(return_time) - julianday(checkout_time)) * 24) AS mean_hours
+    FROM transactions
+    WHERE checkout_time >= ? AND checkout_time < ?
+    GROUP BY tool_id
+"""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--tools", type=int, default=20000)
+    parser.add_argument("--burst", type=int, default=500, help="new checkouts before the incremental refresh")
+    parser.add_argument("--days", type=int, default=30, help="report range, ending 2025-12-31")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "reports.db")
+        initialize_database(db_name)
+        pool = ConnectionPool(db_name, size=1)
+        conn = pool.acquire()
+
+        started = time.perf_counter()
+        seed(conn, args.rows, args.users, args.tools)
+        print(f"seeded {args.rows} transactions in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        applied = reports.refresh(conn)
+        print(f"backfill refresh: {applied} entries in {time.perf_counter() - started:.1f}s")
+
+        conn.executemany(
+            "INSERT INTO transactions (user_id, tool_id, checkout_time) VALUES (?, ?, '2025-12-30 10:00:00-05:00')",
+            [((i % args.users) + 1, (i % args.tools) + 1) for i in range(args.burst)],
+        )
+        conn.commit()
+        started = time.perf_counter()
+        applied = reports.refresh(conn)
+        print(f"incremental refresh: {applied} entries in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        end = date(2025, 12, 31)
+        start = end - timedelta(days=args.days - 1)
+        cases = {
+            "utilization (rollup)": lambda: reports.tool_utilization(conn, start, end),
+            "top borrowers (rollup)": lambda: reports.top_borrowers(conn, start, end),
+            "peak hours (rollup)": lambda: reports.peak_hours(conn, start, end),
+            "overdue (open index)": lambda: reports.overdue_checkouts(conn, 24),
+            "full report": lambda: reports.build_report(conn, start, end),
+            "per-tool full scan": lambda: conn.execute(FULL_SCAN, (str(start), str(end + timedelta(days=1)))).fetchall(),
+        }
+        for label, fn in cases.items():
+            print(f"{label:<24} {timed(fn, args.repeat):8.2f} ms")
+
+        pool.release(conn)
+        pool.close_all()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,406 @@
+"""Load test: a shop shift change against the real Flask routes.
+
+Seeds a synthetic database through the normal schema (log_pages.seed),
+then runs concurrent kiosks. Each kiosk session badges a worker in at
+/verify_rfid, opens /checkout_return, returns what that worker still
+holds at /return_tool, checks out a few tools at /checkout and logs out.
+Admin clients meanwhile poll /admin, /logs and the /admin/api/* listings.
+
+Requests go through Flask's test client (--transport client), through a
+threaded werkzeug server on a local port (--transport server), or to an
+already running server such as gunicorn (--url, pointing it at the same
+--db file). Throughput, p50/p95/p99 per route and lock-contention errors
+are printed and can be saved as JSON; --compare prints the change from an
+earlier result file.
+
+    python -m benchmarks.shift_change --db /tmp/shift.db --kiosks 8 --output before.json
+    python -m benchmarks.shift_change --db /tmp/shift.db --kiosks 8 --compare before.json
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+from benchmarks.log_pages import seed
+from database.connection import ConnectionPool, PoolTimeout
+from database.db_setup import initialize_database
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ADMIN_BADGE = "SHIFT-ADMIN"
+ADMIN_PAGES = [
+    ("GET /admin", "/admin"),
+    ("GET /logs", "/logs"),
+    ("GET /logs", "/logs?open=1"),
+    ("GET /admin/api/tools", "/admin/api/tools?limit=50"),
+    ("GET /admin/api/users", "/admin/api/users?limit=50"),
+    ("GET /admin/api/rooms", "/admin/api/rooms"),
+    ("GET /admin/api/checkedout", "/admin/api/checkedout?limit=50"),
+]
+
+
+# ---------------- DATABASE ----------------
+def prepare_database(db_name, rows, users, tools):
+    """Seed db_name unless it already holds a seeded history."""
+    initialize_database(db_name)
+    pool = ConnectionPool(db_name, size=1)
+    conn = pool.acquire()
+    try:
+        if conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 0:
+            started = time.perf_counter()
+            seed(conn, rows, users, tools)
+            conn.execute("INSERT INTO users (name, rfid_tag, role) VALUES ('Shift Admin', ?, 'admin')",
+                         (ADMIN_BADGE,))
+            conn.commit()
+            print(f"seeded {rows} transactions in {time.perf_counter() - started:.1f}s")
+
+        badges = {row["id"]: row["rfid_tag"] for row in conn.execute("SELECT id, rfid_tag FROM users WHERE role = 'user'")}
+        barcodes = [row[0] for row in conn.execute("SELECT barcode FROM tools WHERE barcode IS NOT NULL")]
+        holdings = defaultdict(list)
+        for row in conn.execute(
+            "SELECT transactions.user_id, tools.barcode FROM transactions "
+            "JOIN tools ON tools.id = transactions.tool_id WHERE transactions.return_time IS NULL"
+        ):
+            holdings[row["user_id"]].append(row["barcode"])
+    finally:
+        pool.release(conn)
+        pool.close_all()
+    return badges, barcodes, holdings
+
+
+# ---------------- TRANSPORTS ----------------
+class TestClientTransport:
+    """Requests through app.test_client(); one client (cookie jar) per kiosk."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def send(self, method, path, form=None):
+        response = self.client.open(path, method=method, data=form)
+        return response.status_code, response.get_data()
+
+    def close(self):
+        pass
+
+
+class HttpTransport:
+    """Keep-alive HTTP/1.1 connection with a minimal cookie jar."""
+
+    def __init__(self, url):
+        parsed = urllib.parse.urlsplit(url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.cookies = {}
+        self.conn = None
+
+    def send(self, method, path, form=None):
+        body = urllib.parse.urlencode(form) if form else None
+        headers = {"Content-Type": "application/x-www-form-urlencoded"} if form else {}
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{name}={value}" for name, value in self.cookies.items())
+        for attempt in (1, 2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                self.conn.request(method, path, body, headers)
+                response = self.conn.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # The server closed an idle keep-alive connection; retry once.
+                self.close()
+                if attempt == 2:
+                    raise
+        for header in response.headers.get_all("Set-Cookie") or []:
+            name, _, rest = header.partition("=")
+            value, _, attributes = rest.partition(";")
+            if "max-age=0" in attributes.lower().replace(" ", ""):
+                self.cookies.pop(name, None)
+            else:
+                self.cookies[name] = value
+        if response.getheader("Connection", "").lower() == "close":
+            self.close()
+        return response.status, data
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def start_server(app):
+    """Serve app from a threaded werkzeug server on a free local port."""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class KeepAliveHandler(WSGIRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, name="shift-change-server", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+# ---------------- CLIENTS ----------------
+class Recorder:
+    """Latency samples per route plus status and outcome counts, shared by all clients."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.statuses = Counter()
+        self.outcomes = Counter()
+        self.server_errors = Counter()
+        self._lock = threading.Lock()
+
+    def timed(self, transport, label, method, path, form=None):
+        started = time.perf_counter()
+        try:
+            status, body = transport.send(method, path, form)
+        except (OSError, http.client.HTTPException) as exc:
+            status, body = type(exc).__name__, b""
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.samples[label].append(elapsed)
+            self.statuses[str(status)] += 1
+        return status, body
+
+    def count(self, outcome):
+        with self._lock:
+            self.outcomes[outcome] += 1
+
+    def request_exception(self, sender, exception, **extra):
+        """got_request_exception handler: classify what turned into a 500."""
+        if isinstance(exception, sqlite3.OperationalError) and "locked" in str(exception):
+            kind = "database_locked"
+        elif isinstance(exception, PoolTimeout):
+            kind = "pool_timeout"
+        else:
+            kind = type(exception).__name__
+        with self._lock:
+            self.server_errors[kind] += 1
+
+
+def kiosk(transport, recorder, badges, barcodes, holdings, sessions, max_tools, think, rng):
+    """Badge workers in and out, returning their tools and taking new ones."""
+    user_ids = sorted(badges)
+
+    def pause():
+        if think:
+            time.sleep(rng.expovariate(1 / think))
+
+    for _ in range(sessions):
+        user_id = rng.choice(user_ids)
+        status, _ = recorder.timed(transport, "POST /verify_rfid", "POST", "/verify_rfid",
+                                   {"rfid": badges[user_id]})
+        if status != 302:
+            recorder.count("badge_rejected")
+            continue
+        recorder.timed(transport, "GET /checkout_return", "GET", "/checkout_return")
+        pause()
+
+        held = holdings.pop(user_id, [])
+        if held:
+            recorder.timed(transport, "GET /return_tool", "GET", "/return_tool")
+            for barcode in held:
+                status, body = recorder.timed(transport, "POST /return_tool", "POST", "/return_tool",
+                                              {"barcode": barcode})
+                recorder.count("returned" if status == 200 and b"alert-success" in body else "return_rejected")
+                pause()
+
+        recorder.timed(transport, "GET /checkout", "GET", "/checkout")
+        for barcode in rng.sample(barcodes, rng.randint(1, max_tools)):
+            status, body = recorder.timed(transport, "POST /checkout", "POST", "/checkout", {"barcode": barcode})
+            if status == 200 and b"alert-success" in body:
+                holdings[user_id].append(barcode)
+                recorder.count("checked_out")
+            else:
+                recorder.count("checkout_rejected")
+            pause()
+
+        recorder.timed(transport, "GET /logout", "GET", "/logout")
+        recorder.count("sessions")
+
+
+def admin(transport, recorder, stop, think, rng):
+    """Poll the admin pages until the kiosks are done."""
+    recorder.timed(transport, "POST /verify_rfid", "POST", "/verify_rfid", {"rfid": ADMIN_BADGE})
+    while not stop.is_set():
+        label, path = rng.choice(ADMIN_PAGES)
+        recorder.timed(transport, label, "GET", path)
+        if think:
+            time.sleep(rng.expovariate(1 / think))
+
+
+# ---------------- RESULTS ----------------
+def percentile(samples, fraction):
+    return samples[min(len(samples) - 1, max(0, round(len(samples) * fraction) - 1))]
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 3),
+        "max_ms": round(samples[-1] * 1000, 3),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results):
+    print(f"{results['requests']} requests in {results['elapsed_s']:.1f}s "
+          f"({results['throughput_rps']:.0f} req/s, {results['sessions_per_s']:.1f} kiosk sessions/s)")
+    print(f"{'route':<22} {'count':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for label, stats in results["routes"].items():
+        print(f"{label:<22} {stats['count']:>7} {stats['p50_ms']:>7.1f}ms {stats['p95_ms']:>7.1f}ms "
+              f"{stats['p99_ms']:>7.1f}ms {stats['max_ms']:>7.1f}ms")
+    print("statuses:", dict(results["statuses"]))
+    print("outcomes:", dict(results["outcomes"]))
+    if results["server_errors"] is None:
+        print("server errors: not visible from outside the server process (see 5xx statuses)")
+    else:
+        print("server errors:", results["server_errors"] or "none", f"(lock contention: {results['lock_errors']})")
+
+
+def compare(results, baseline):
+    """Print throughput and per-route p95 changes against an earlier run."""
+    def change(new, old):
+        return f"{(new / old - 1):+.1%}" if old else "n/a"
+
+    print(f"\nvs. {baseline.get('revision') or 'baseline'} ({baseline.get('finished_at', '?')}):")
+    print(f"  throughput {baseline['throughput_rps']:.0f} -> {results['throughput_rps']:.0f} req/s "
+          f"({change(results['throughput_rps'], baseline['throughput_rps'])})")
+    print(f"  lock errors {baseline['lock_errors']} -> {results['lock_errors']}")
+    for label, stats in results["routes"].items():
+        old = baseline["routes"].get(label)
+        if old:
+            print(f"  {label:<22} p95 {old['p95_ms']:7.1f} -> {stats['p95_ms']:7.1f}ms "
+                  f"({change(stats['p95_ms'], old['p95_ms'])})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database file to seed once and reuse (default: a temporary copy)")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--tools", type=int, default=20000)
+    parser.add_argument("--kiosks", type=int, default=8)
+    parser.add_argument("--admins", type=int, default=1, help="clients polling the admin pages")
+    parser.add_argument("--sessions", type=int, default=100, help="badge-in sessions per kiosk")
+    parser.add_argument("--max-tools", type=int, default=3, help="checkouts per session (1..N)")
+    parser.add_argument("--think", type=float, default=0.0, help="mean pause between scans, seconds")
+    parser.add_argument("--transport", choices=["client", "server"], default="client")
+    parser.add_argument("--url", help="drive an already running server instead (e.g. gunicorn)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="JSON results from an earlier run")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = args.db or os.path.join(tmp, "shift.db")
+        badges, barcodes, holdings = prepare_database(db_name, args.rows, args.users, args.tools)
+
+        from flask import got_request_exception
+        from app import create_app, warm_caches
+
+        recorder = Recorder()
+        server = None
+        url = args.url
+        if url:
+            transport_name = "external"
+        else:
+            application = create_app({"DATABASE": db_name, "ALERT_INTERVAL": 0, "METRICS": False,
+                                      "DB_POOL_SIZE": max(8, args.kiosks + args.admins)})
+            warm_caches(application)
+            got_request_exception.connect(recorder.request_exception, application)
+            transport_name = args.transport
+            if args.transport == "server":
+                server, url = start_server(application)
+
+        def transport():
+            return HttpTransport(url) if url else TestClientTransport(application)
+
+        # Users are split between kiosks so two kiosks never badge in the same worker.
+        user_ids = sorted(badges)
+        stop = threading.Event()
+        kiosks = []
+        for index in range(args.kiosks):
+            mine = user_ids[index::args.kiosks]
+            kiosks.append(threading.Thread(target=kiosk, args=(
+                transport(), recorder, {uid: badges[uid] for uid in mine}, barcodes,
+                defaultdict(list, {uid: holdings[uid] for uid in mine if uid in holdings}),
+                args.sessions, args.max_tools, args.think, random.Random(args.seed + index),
+            )))
+        admins = [threading.Thread(target=admin, args=(transport(), recorder, stop, args.think,
+                                                       random.Random(args.seed - index - 1)))
+                  for index in range(args.admins)]
+
+        started = time.perf_counter()
+        for thread in kiosks + admins:
+            thread.start()
+        for thread in kiosks:
+            thread.join()
+        stop.set()
+        for thread in admins:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        if server is not None:
+            server.shutdown()
+
+    requests = sum(len(samples) for samples in recorder.samples.values())
+    results = {
+        "revision": git_revision(),
+        "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "transport": transport_name,
+        "elapsed_s": round(elapsed, 3),
+        "requests": requests,
+        "throughput_rps": round(requests / elapsed, 1),
+        "sessions_per_s": round(recorder.outcomes["sessions"] / elapsed, 2),
+        "routes": {label: summarize(recorder.samples[label]) for label in sorted(recorder.samples)},
+        "all": summarize([sample for samples in recorder.samples.values() for sample in samples]),
+        "statuses": dict(recorder.statuses),
+        "outcomes": dict(recorder.outcomes),
+        "server_errors": None,
+        "lock_errors": None,
+    }
+    if transport_name != "external":
+        results["server_errors"] = dict(recorder.server_errors)
+        results["lock_errors"] = recorder.server_errors["database_locked"] + recorder.server_errors["pool_timeout"]
+    print_results(results)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            compare(results, json.load(file))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+        print(f"\nwrote {args.output}")
+
+    failed = sum(count for status, count in recorder.statuses.items() if not status.isdigit() or int(status) >= 500)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
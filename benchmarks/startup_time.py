@@ -0,0 +1,95 @@
+"""Benchmark: cold-start cost of importing app.py and building the app.
+
+Every sample runs in a fresh interpreter, so nothing is warm except the OS
+file cache. Reports wall time for `import app`, for create_app() plus cache
+warming, and the slowest modules from python -X importtime.
+
+    python -m benchmarks.startup_time --runs 10
+"""
+import argparse
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP = """
+import time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+app.warm_caches(application)
+warmed = time.perf_counter()
+print(imported - started, created - imported, warmed - created)
+"""
+
+IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def run(env, *args):
+    return subprocess.run([sys.executable, *args], cwd=ROOT, env=env, check=True,
+                          capture_output=True, text=True)
+
+
+def slowest_imports(env, count):
+    """(cumulative_us, module) for the slowest top-level imports of app.py."""
+    stderr = run(env, "-X", "importtime", "-c", "import app").stderr
+    modules = []
+    for match in IMPORTTIME.finditer(stderr):
+        if len(match.group(3)) <= 3:  # app.py itself and its direct imports
+            modules.append((int(match.group(2)), match.group(4)))
+    return sorted(modules, reverse=True)[:count]
+
+
+def report(label, samples):
+    print(f"{label:<14} min={min(samples) * 1e3:7.1f}ms median={statistics.median(samples) * 1e3:7.1f}ms "
+          f"max={max(samples) * 1e3:7.1f}ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--db", default=os.path.join(ROOT, "tool_management.db"),
+                        help="database to copy for the create_app step")
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "startup.db")
+        if os.path.exists(args.db):
+            shutil.copy(args.db, db_name)
+        env = dict(os.environ, TOOL_DATABASE=db_name, PYTHONPATH=ROOT)
+
+        # First run migrates the copy and writes bytecode; it is not timed.
+        run(env, "-c", STARTUP)
+
+        interpreter, imports, creates, warms = [], [], [], []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            run(env, "-c", "pass")
+            interpreter.append(time.perf_counter() - started)
+            imported, created, warmed = map(float, run(env, "-c", STARTUP).stdout.split())
+            imports.append(imported)
+            creates.append(created)
+            warms.append(warmed)
+
+        print(f"{args.runs} cold starts")
+        report("interpreter", interpreter)
+        report("import app", imports)
+        report("create_app()", creates)
+        report("warm_caches()", warms)
+        print("\nslowest imports (cumulative):")
+        for micros, module in slowest_imports(env, args.top):
+            print(f"  {micros / 1e3:7.1f}ms  {module}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""Concurrency stress test for the checkout/return engine.
+
+Many workers hammer the same barcode against one database file. At the end
+the stock on the shelf plus the open transactions must equal the starting
+stock, the per-room stock must add up to that shelf total, and every
+successful checkout must have exactly one transactions row.
+
+    python -m benchmarks.stress_checkout --workers 16 --ops 200 --mode process
+"""
+import argparse
+import multiprocessing
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+
+from database.connection import ConnectionPool
+from database.db_setup import initialize_database
+from utils import transactions
+
+BARCODE = "STRESS-001"
+
+
+def seed(db_name, workers, stock):
+    initialize_database(db_name)
+    pool = ConnectionPool(db_name, size=1)
+    conn = pool.acquire()
+    conn.executemany(
+        "INSERT INTO users (name, rfid_tag) VALUES (?, ?)",
+        [(f"Worker {i}", f"STRESS{i:04d}") for i in range(workers)],
+    )
+    conn.execute("INSERT INTO tools (name, barcode, quantity) VALUES (?, ?, ?)", ("Stress Tool", BARCODE, stock))
+    conn.commit()
+    user_ids = [row["id"] for row in conn.execute("SELECT id FROM users ORDER BY id")]
+    pool.release(conn)
+    pool.close_all()
+    return user_ids
+
+
+def run_worker(db_name, user_id, ops, results):
+    """Alternate checkouts and returns; record what the engine reported."""
+    pool = ConnectionPool(db_name, size=1)
+    conn = pool.acquire()
+    checked_out = returned = rejected = 0
+    try:
+        for i in range(ops):
+            if i % 3 == 2:
+                result = transactions.return_tool(conn, user_id, BARCODE)
+                returned += "message" in result
+            else:
+                result = transactions.checkout_tool(conn, user_id, BARCODE)
+                checked_out += "message" in result
+            rejected += "error" in result
+    finally:
+        pool.release(conn)
+        pool.close_all()
+    results.put((checked_out, returned, rejected))
+
+
+def verify(db_name, stock, checked_out, returned):
+    pool = ConnectionPool(db_name, size=1)
+    conn = pool.acquire()
+    quantity = conn.execute("SELECT quantity FROM tools WHERE barcode = ?", (BARCODE,)).fetchone()[0]
+    total_rows = conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+    open_rows = conn.execute("SELECT COUNT(*) FROM transactions WHERE return_time IS NULL").fetchone()[0]
+    on_shelves = conn.execute(
+        "SELECT COALESCE(SUM(tool_stock.quantity), 0) FROM tool_stock "
+        "JOIN tools ON tools.id = tool_stock.tool_id WHERE tools.barcode = ?",
+        (BARCODE,),
+    ).fetchone()[0]
+    pool.release(conn)
+    pool.close_all()
+
+    failures = []
+    if quantity + open_rows != stock:
+        failures.append(f"quantity {quantity} + open {open_rows} != stock {stock}")
+    if total_rows != checked_out:
+        failures.append(f"{total_rows} transaction rows for {checked_out} successful checkouts")
+    if total_rows - open_rows != returned:
+        failures.append(f"{total_rows - open_rows} closed rows for {returned} successful returns")
+    if on_shelves != quantity:
+        failures.append(f"room stock sums to {on_shelves} but tools.quantity is {quantity}")
+    if quantity < 0:
+        failures.append(f"negative quantity {quantity}")
+    return quantity, open_rows, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=200, help="operations per worker")
+    parser.add_argument("--stock", type=int, default=50)
+    parser.add_argument("--mode", choices=["thread", "process"], default="thread")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "stress.db")
+        user_ids = seed(db_name, args.workers, args.stock)
+
+        if args.mode == "process":
+            results = multiprocessing.Queue()
+            workers = [multiprocessing.Process(target=run_worker, args=(db_name, uid, args.ops, results))
+                       for uid in user_ids]
+        else:
+            results = queue.Queue()
+            workers = [threading.Thread(target=run_worker, args=(db_name, uid, args.ops, results))
+                       for uid in user_ids]
+
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        totals = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        checked_out = sum(t[0] for t in totals)
+        returned = sum(t[1] for t in totals)
+        rejected = sum(t[2] for t in totals)
+        quantity, open_rows, failures = verify(db_name, args.stock, checked_out, returned)
+
+    ops = args.workers * args.ops
+    print(f"{args.workers} {args.mode} workers x {args.ops} ops in {elapsed:.2f}s ({ops / elapsed:.0f} ops/s)")
+    print(f"checkouts={checked_out} returns={returned} rejected={rejected} "
+          f"on_shelf={quantity} still_out={open_rows}")
+
+    if failures:
+        for failure in failures:
+            print("LOST UPDATE:", failure)
+        return 1
+    print("OK: no lost updates")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,285 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_app_context
+
+DB_NAME = "tool_management.db"
+POOL_SIZE = 8
+BUSY_TIMEOUT_MS = 5000
+STATEMENT_CACHE_SIZE = 256
+
+# Applied once per physical connection, not per request.
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+    "PRAGMA cache_size = -8000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA foreign_keys = ON",
+)
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes free in time."""
+
+
+# Called as observer(sql, seconds) after every statement; see utils.metrics.
+_query_observer = None
+
+
+def set_query_observer(observer):
+    """Time statements on connections opened from now on (None turns it off)."""
+    global _query_observer
+    _query_observer = observer
+
+
+def _report(sql, started):
+    observer = _query_observer
+    if observer is not None:
+        observer(sql, time.perf_counter() - started)
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that reports a statement once its rows are consumed.
+
+    sqlite3 runs only the first step in execute(); the rest happens while
+    rows are fetched, so fetch and iteration time is added to the statement.
+    The total is reported when the rows run out, the cursor is reused or
+    closed, or it is garbage collected.
+    """
+
+    _sql = None
+    _seconds = 0.0
+
+    def execute(self, sql, parameters=()):
+        self._flush()
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._sql, self._seconds = sql, time.perf_counter() - started
+
+    def executemany(self, sql, seq_of_parameters):
+        self._flush()
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._sql, self._seconds = sql, time.perf_counter() - started
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._seconds += time.perf_counter() - started
+        if row is None:
+            self._flush()
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        started = time.perf_counter()
+        rows = super().fetchmany(*args, **kwargs)
+        self._seconds += time.perf_counter() - started
+        if not rows:
+            self._flush()
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            self._seconds += time.perf_counter() - started
+            self._flush()
+
+    def __next__(self, _next=sqlite3.Cursor.__next__, _clock=time.perf_counter):
+        # Runs once per row, hence the bound locals.
+        started = _clock()
+        try:
+            row = _next(self)
+        except StopIteration:
+            self._seconds += _clock() - started
+            self._flush()
+            raise
+        self._seconds += _clock() - started
+        return row
+
+    def close(self):
+        self._flush()
+        super().close()
+
+    def __del__(self):
+        self._flush()
+
+    def _flush(self):
+        if self._sql is not None:
+            sql, self._sql = self._sql, None
+            observer = _query_observer
+            if observer is not None:
+                observer(sql, self._seconds)
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors report each statement's wall time to the query observer."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            _report("COMMIT", started)
+
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections shared by the threads of one process."""
+
+    def __init__(self, db_name=DB_NAME, size=POOL_SIZE):
+        self.db_name = db_name
+        self.size = size
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_name,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            factory=TimedConnection if _query_observer is not None else sqlite3.Connection,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self, timeout=None):
+        """Check out a connection, opening a new one if none are idle."""
+        if self._pid != os.getpid():
+            # Connections must never cross a fork (e.g. gunicorn --preload).
+            self._reset()
+
+        if not self._slots.acquire(timeout=timeout):
+            raise PoolTimeout(f"No database connection free after {timeout}s")
+
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        try:
+            return self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn):
+        """Return a connection to the pool, discarding any open transaction."""
+        if self._pid != os.getpid():
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put_nowait(conn)
+        except sqlite3.Error:
+            conn.close()
+        finally:
+            self._slots.release()
+
+    def close_all(self):
+        """Close every idle connection."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def configure_pool(db_name=DB_NAME, size=POOL_SIZE):
+    """Replace the process-wide pool, e.g. to point at another database file."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all()
+        _pool = ConnectionPool(db_name, size)
+    return _pool
+
+
+def get_pool():
+    """Return the process-wide pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+# ---------------- FLASK INTEGRATION ----------------
+def get_db():
+    """Return the connection bound to the current app context."""
+    if "db" not in g:
+        g.db_pool = get_pool()
+        g.db = g.db_pool.acquire()
+    return g.db
+
+
+def close_db(exception=None):
+    """Hand the app context's connection back to the pool."""
+    conn = g.pop("db", None)
+    pool = g.pop("db_pool", None)
+    if conn is not None:
+        pool.release(conn)
+
+
+def init_app(app):
+    """Register the teardown hook that releases per-request connections."""
+    app.teardown_appcontext(close_db)
+
+
+@contextmanager
+def connection():
+    """Yield a pooled connection, reusing the request's one inside Flask."""
+    if has_app_context():
+        yield get_db()
+        return
+
+    pool = get_pool()
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+
+
+@contextmanager
+def immediate_transaction(conn):
+    """Run a block inside BEGIN IMMEDIATE, committing or rolling back."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
@@ -1,63 +1,25 @@
 import sqlite3
-import bcrypt
 
-DB_NAME = "tool_management.db"
-
-def initialize_database():
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-
-    # Users table (for tool checkouts)
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        rfid_tag TEXT UNIQUE NOT NULL
-    )
-    """)
+from database.migrations import migrate
+from utils.auth import ensure_default_admin
 
-    # Admins table (for managing the system)
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS admins (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE NOT NULL,
-        password TEXT NOT NULL
-    )
-    """)
+DB_NAME = "tool_management.db"
 
-    # Tools table with quantity tracking
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS tools (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        barcode TEXT UNIQUE NOT NULL,
-        quantity INTEGER NOT NULL CHECK(quantity >= 0) DEFAULT 1
-    )
-    """)
+def initialize_database(db_name=DB_NAME):
+    conn = sqlite3.connect(db_name)
+    conn.row_factory = sqlite3.Row
 
-    # Transactions table (Tracks checkouts and returns)
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS transactions (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        tool_id INTEGER NOT NULL,
-        checkout_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        return_time TIMESTAMP,
-        FOREIGN KEY (user_id) REFERENCES users(id),
-        FOREIGN KEY (tool_id) REFERENCES tools(id) ON DELETE CASCADE
-    )
-    """)
+    # Tables, columns, indexes and default settings are versioned migrations
+    applied = migrate(conn)
 
     # Add a default admin account if no admin exists
-    default_admin = ("admin", bcrypt.hashpw("admin123".encode("utf-8"), bcrypt.gensalt()))
-
-    cursor.execute("SELECT COUNT(*) FROM admins")
-    if cursor.fetchone()[0] == 0:
-        cursor.execute("INSERT INTO admins (username, password) VALUES (?, ?)", default_admin)
+    ensure_default_admin(conn)
 
     conn.commit()
     conn.close()
+    return applied
 
 if __name__ == "__main__":
-    initialize_database()
+    for name in initialize_database():
+        print("Applied migration:", name)
     print("Database initialized successfully.")
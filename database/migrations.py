@@ -0,0 +1,326 @@
+"""Versioned schema migrations.
+
+The schema version lives in PRAGMA user_version, so an up-to-date database
+costs a single pragma read at startup. Each applied migration is also
+recorded in the schema_version table for auditing. Migrations must stay
+idempotent: older deployments were patched by hand and may already have
+some of the objects a migration creates.
+"""
+import sqlite3
+
+from database.connection import immediate_transaction
+
+
+def column_exists(conn, table, column):
+    return any(row[1] == column for row in conn.execute(f"PRAGMA table_info({table})"))
+
+
+def add_column(conn, table, column, definition):
+    if not column_exists(conn, table, column):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+# ---------------- MIGRATIONS ----------------
+def base_schema(conn):
+    """Tables app.py depends on, as originally created by db_setup."""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        rfid_tag TEXT UNIQUE NOT NULL
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS admins (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS tools (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        barcode TEXT UNIQUE NOT NULL,
+        quantity INTEGER NOT NULL CHECK(quantity >= 0) DEFAULT 1
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        tool_id INTEGER NOT NULL,
+        checkout_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        return_time TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        FOREIGN KEY (tool_id) REFERENCES tools(id) ON DELETE CASCADE
+    )
+    """)
+
+
+def rooms_and_settings(conn):
+    """Tables that were only ever created by hand on live installs."""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS rooms (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS settings (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+    """)
+
+
+def user_roles_and_tool_images(conn):
+    add_column(conn, "users", "role", "TEXT DEFAULT 'user'")
+    add_column(conn, "tools", "image", "TEXT")
+
+
+def transaction_indexes(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_checkout_time ON transactions(checkout_time)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_tool_open ON transactions(tool_id, return_time)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_user_open ON transactions(user_id, return_time)")
+
+
+def default_settings(conn):
+    conn.executemany(
+        "INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)",
+        [("auto_logout_time", "60"), ("auto_submit_length", "6")],
+    )
+
+
+def admin_search(conn):
+    """Indexes and trigram FTS5 tables behind the admin panel search box."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_users_name_nocase ON users(name COLLATE NOCASE)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tools_name_nocase ON tools(name COLLATE NOCASE)")
+
+    try:
+        conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS users_fts
+        USING fts5(name, rfid_tag, content='users', content_rowid='id', tokenize='trigram')
+        """)
+        conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS tools_fts
+        USING fts5(name, barcode, content='tools', content_rowid='id', tokenize='trigram')
+        """)
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5 or the trigram tokenizer: search uses LIKE.
+        return
+
+    for table, columns in (("users", ("name", "rfid_tag")), ("tools", ("name", "barcode"))):
+        cols = ", ".join(columns)
+        new = ", ".join(f"new.{column}" for column in columns)
+        old = ", ".join(f"old.{column}" for column in columns)
+        conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+            INSERT INTO {table}_fts(rowid, {cols}) VALUES (new.id, {new});
+        END
+        """)
+        conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+            INSERT INTO {table}_fts({table}_fts, rowid, {cols}) VALUES ('delete', old.id, {old});
+        END
+        """)
+        # Only the searchable columns: quantity updates must not touch the index.
+        conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF {cols} ON {table} BEGIN
+            INSERT INTO {table}_fts({table}_fts, rowid, {cols}) VALUES ('delete', old.id, {old});
+            INSERT INTO {table}_fts(rowid, {cols}) VALUES (new.id, {new});
+        END
+        """)
+        conn.execute(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')")
+
+
+def usage_rollups(conn):
+    """Summary tables for utils.reports and the log that feeds them."""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS usage_hourly (
+        day TEXT NOT NULL,
+        hour INTEGER NOT NULL,
+        checkouts INTEGER NOT NULL DEFAULT 0,
+        returns INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, hour)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS usage_daily (
+        day TEXT NOT NULL,
+        tool_id INTEGER NOT NULL,
+        checkouts INTEGER NOT NULL DEFAULT 0,
+        returns INTEGER NOT NULL DEFAULT 0,
+        busy_seconds REAL NOT NULL DEFAULT 0,
+        duration_seconds REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, tool_id)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS usage_daily_users (
+        day TEXT NOT NULL,
+        user_id INTEGER NOT NULL,
+        checkouts INTEGER NOT NULL DEFAULT 0,
+        returns INTEGER NOT NULL DEFAULT 0,
+        duration_seconds REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, user_id)
+    ) WITHOUT ROWID
+    """)
+    # AUTOINCREMENT so ids never go back below the high-water mark once
+    # processed entries have been deleted.
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS rollup_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        transaction_id INTEGER NOT NULL,
+        kind TEXT NOT NULL CHECK (kind IN ('checkout', 'return'))
+    )
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS transactions_rollup_insert AFTER INSERT ON transactions BEGIN
+        INSERT INTO rollup_log (transaction_id, kind) VALUES (new.id, 'checkout');
+        INSERT INTO rollup_log (transaction_id, kind) SELECT new.id, 'return' WHERE new.return_time IS NOT NULL;
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS transactions_rollup_return AFTER UPDATE OF return_time ON transactions
+    WHEN old.return_time IS NULL AND new.return_time IS NOT NULL BEGIN
+        INSERT INTO rollup_log (transaction_id, kind) VALUES (new.id, 'return');
+    END
+    """)
+    # Open checkouts are a tiny slice of the table; overdue and live
+    # utilization queries read only this index.
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_transactions_open ON transactions(checkout_time)
+    WHERE return_time IS NULL
+    """)
+
+    # Queue the existing history; the first refresh() rolls it up.
+    if not conn.execute("SELECT 1 FROM rollup_log LIMIT 1").fetchone():
+        conn.execute("INSERT INTO rollup_log (transaction_id, kind) SELECT id, 'checkout' FROM transactions ORDER BY id")
+        conn.execute("""
+        INSERT INTO rollup_log (transaction_id, kind)
+        SELECT id, 'return' FROM transactions WHERE return_time IS NOT NULL ORDER BY id
+        """)
+
+
+def alerts(conn):
+    """Alert history for utils.alerts; at most one active alert per subject."""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS alerts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        subject_id INTEGER NOT NULL,
+        message TEXT NOT NULL,
+        raised_at TIMESTAMP NOT NULL,
+        resolved_at TIMESTAMP
+    )
+    """)
+    conn.execute("""
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_alerts_active ON alerts(kind, subject_id)
+    WHERE resolved_at IS NULL
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tools_quantity ON tools(quantity)")
+
+
+def room_stock(conn):
+    """Stock per (tool, room); tools.quantity stays as the total over all rooms."""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS tool_stock (
+        tool_id INTEGER NOT NULL REFERENCES tools(id) ON DELETE CASCADE,
+        room_id INTEGER NOT NULL REFERENCES rooms(id),
+        quantity INTEGER NOT NULL CHECK(quantity >= 0) DEFAULT 0,
+        PRIMARY KEY (tool_id, room_id)
+    ) WITHOUT ROWID
+    """)
+    # Per-room totals for /api/rooms are read from this index alone.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tool_stock_room ON tool_stock(room_id, quantity)")
+    add_column(conn, "transactions", "room_id", "INTEGER REFERENCES rooms(id)")
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_transactions_open_room ON transactions(room_id)
+    WHERE return_time IS NULL
+    """)
+
+    # Every unit lives in some room: existing stock, and stock given to new
+    # tools by add_tool or a bulk import, starts in the first room.
+    conn.execute("INSERT INTO rooms (name) SELECT 'Main room' WHERE NOT EXISTS (SELECT 1 FROM rooms)")
+    conn.execute("""
+    INSERT OR IGNORE INTO tool_stock (tool_id, room_id, quantity)
+    SELECT id, (SELECT MIN(id) FROM rooms), quantity FROM tools
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS tools_stock_insert AFTER INSERT ON tools BEGIN
+        INSERT INTO tool_stock (tool_id, room_id, quantity)
+        SELECT new.id, MIN(id), new.quantity FROM rooms HAVING MIN(id) IS NOT NULL;
+    END
+    """)
+
+
+def kiosk_sessions(conn):
+    """Hardware kiosk sessions, shared by every worker process."""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS kiosk_sessions (
+        kiosk TEXT PRIMARY KEY,
+        user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+        mode TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    ) WITHOUT ROWID
+    """)
+
+
+def event_log(conn):
+    """Browser events (utils.events), written by any worker and long-polled by all."""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        data TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+
+# Append only: never reorder or edit a migration that has shipped.
+MIGRATIONS = [
+    (1, "base schema", base_schema),
+    (2, "rooms and settings tables", rooms_and_settings),
+    (3, "users.role and tools.image", user_roles_and_tool_images),
+    (4, "transaction indexes", transaction_indexes),
+    (5, "default settings", default_settings),
+    (6, "admin search indexes", admin_search),
+    (7, "usage rollup tables", usage_rollups),
+    (8, "alerts", alerts),
+    (9, "per-room stock", room_stock),
+    (10, "kiosk sessions", kiosk_sessions),
+    (11, "event log", event_log),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Bring the database up to LATEST_VERSION; returns the migrations applied."""
+    if current_version(conn) >= LATEST_VERSION:
+        return []
+
+    applied = []
+    with immediate_transaction(conn):
+        # Another worker may have migrated while we waited for the lock.
+        version = current_version(conn)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        for number, name, migration in MIGRATIONS:
+            if number <= version:
+                continue
+            migration(conn)
+            conn.execute("INSERT OR REPLACE INTO schema_version (version, name) VALUES (?, ?)", (number, name))
+            applied.append(name)
+        conn.execute(f"PRAGMA user_version = {LATEST_VERSION}")
+    return applied
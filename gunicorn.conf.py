@@ -0,0 +1,28 @@
+"""gunicorn settings for wsgi:application; each can be overridden on the command line."""
+import multiprocessing
+import os
+
+bind = os.environ.get("TOOL_BIND", "0.0.0.0:8000")
+# Build the app and warm its caches once, before forking the workers.
+preload_app = True
+workers = int(os.environ.get("TOOL_WORKERS", min(multiprocessing.cpu_count(), 4)))
+# Threaded workers. An /events long-poll holds a thread while it waits, but
+# at most EVENTS_MAX_WAITERS (4) of them per worker; keep threads above that.
+worker_class = "gthread"
+threads = int(os.environ.get("TOOL_THREADS", 8))
+timeout = 30
+graceful_timeout = 10
+
+
+def post_fork(server, worker):
+    # Background threads do not survive the fork, so each worker starts its
+    # own alert checker; the alerts table keeps them from double-notifying.
+    from app import start_alert_scheduler
+    from wsgi import application
+    start_alert_scheduler(application)
+
+
+def pre_fork(server, worker):
+    # A SQLite connection must never cross a fork; drop any the master holds.
+    from database.connection import get_pool
+    get_pool().close_all()
@@ -0,0 +1,320 @@
+"""Asynchronous reader service for kiosk RFID and barcode devices.
+
+Reads several input sources at once (stdin, named pipes, or serial-style
+character devices), drops duplicate reads of the same tag inside a debounce
+window, groups events into small batches and posts them to the web app's
+/hardware/events endpoint.
+
+    python -m hardware.reader_service --kiosk crib-1 \\
+        --rfid /dev/ttyUSB0 --barcode /tmp/barcode.fifo --stdin
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import logging
+import os
+import stat
+import sys
+import threading
+import time
+import urllib.request
+
+log = logging.getLogger("reader_service")
+
+DEFAULT_URL = "http://127.0.0.1:5000/hardware/events"
+DEBOUNCE_WINDOW = 0.75  # seconds
+MAX_BATCH = 50
+MAX_BATCH_DELAY = 0.05  # seconds
+QUEUE_SIZE = 10000
+EVENT_KINDS = ("rfid", "barcode", "mode")
+
+
+class ScanEvent:
+    """One read from a device."""
+
+    __slots__ = ("kind", "value", "device", "timestamp")
+
+    def __init__(self, kind, value, device, timestamp=None):
+        self.kind = kind
+        self.value = value
+        self.device = device
+        self.timestamp = time.monotonic() if timestamp is None else timestamp
+
+    def to_dict(self):
+        return {"kind": self.kind, "value": self.value, "device": self.device}
+
+
+def parse_line(line, default_kind, device):
+    """Turn a raw line into a ScanEvent; lines may be prefixed 'kind:'."""
+    line = line.strip()
+    if not line:
+        return None
+    kind, sep, value = line.partition(":")
+    if sep and kind in EVENT_KINDS:
+        return ScanEvent(kind, value.strip(), device)
+    return ScanEvent(default_kind, line, device)
+
+
+# ---------------- SOURCES ----------------
+# Blocking open() and readline() on a pipe or device cannot be cancelled, so
+# each source reads in its own daemon thread rather than the event loop's
+# executor, which asyncio.run waits for at shutdown.
+async def read_lines(queue, read, default_kind, device, wake=None):
+    """Queue events from `read(put, stop)`, run in a daemon thread, until it returns.
+
+    Cancelling this coroutine sets `stop` and calls `wake` so a thread still
+    waiting in open() can see it.
+    """
+    loop = asyncio.get_running_loop()
+    lines = asyncio.Queue()
+    stop = threading.Event()
+
+    def put(line):
+        try:
+            loop.call_soon_threadsafe(lines.put_nowait, line)
+        except RuntimeError:
+            stop.set()  # The loop has closed.
+
+    def target():
+        try:
+            read(put, stop)
+        finally:
+            put(None)
+
+    threading.Thread(target=target, name=f"reader {device}", daemon=True).start()
+    try:
+        while True:
+            line = await lines.get()
+            if line is None:
+                return
+            event = parse_line(line, default_kind, device)
+            if event:
+                await queue.put(event)
+    finally:
+        stop.set()
+        if wake is not None:
+            wake()
+
+
+async def read_stdin(queue, default_kind="barcode"):
+    """Read typed or piped scans from stdin until EOF."""
+    def read(put, stop):
+        for line in iter(sys.stdin.readline, ""):
+            if stop.is_set():
+                return
+            put(line)
+
+    await read_lines(queue, read, default_kind, "stdin")
+
+
+def follow(path, put, stop, poll_interval=0.05, retry_interval=1.0):
+    """Follow a named pipe or device file, reopening it when a writer closes.
+
+    Regular files are tailed like `tail -f`, which is how a serial reader is
+    simulated locally.
+    """
+    while not stop.is_set():
+        try:
+            handle = open(path, "r", 1)  # Blocks on a FIFO until a writer opens it.
+        except OSError as exc:
+            log.error("Could not open %s: %s", path, exc)
+            stop.wait(retry_interval)
+            continue
+        with handle:
+            is_fifo = stat.S_ISFIFO(os.fstat(handle.fileno()).st_mode)
+            while not stop.is_set():
+                line = handle.readline()
+                if not line:
+                    if is_fifo:
+                        break  # Writer went away; reopen and wait for the next one.
+                    stop.wait(poll_interval)
+                    continue
+                put(line)
+
+
+def wake_fifo(path):
+    """Unblock a reader waiting in open() on a FIFO with no writer."""
+    try:
+        if not stat.S_ISFIFO(os.stat(path).st_mode):
+            return
+        fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+    except OSError:
+        return  # Gone, or nobody is waiting in open().
+    os.close(fd)
+
+
+async def read_device(queue, path, default_kind, poll_interval=0.05):
+    """Queue scans read from a named pipe or device file until cancelled."""
+    await read_lines(queue, lambda put, stop: follow(path, put, stop, poll_interval),
+                     default_kind, path, wake=lambda: wake_fifo(path))
+
+
+# ---------------- DEBOUNCE AND BATCHING ----------------
+class Debouncer:
+    """Drops a read if the same kind/value was accepted within `window`."""
+
+    def __init__(self, window=DEBOUNCE_WINDOW):
+        self.window = window
+        self._last_seen = {}
+
+    def accept(self, event):
+        key = (event.kind, event.value)
+        last = self._last_seen.get(key)
+        if last is not None and event.timestamp - last < self.window:
+            return False
+        self._last_seen[key] = event.timestamp
+        if len(self._last_seen) > 4096:
+            self._prune(event.timestamp)
+        return True
+
+    def _prune(self, now):
+        self._last_seen = {key: ts for key, ts in self._last_seen.items() if now - ts < self.window}
+
+
+async def next_batch(queue, debouncer, max_batch=MAX_BATCH, max_delay=MAX_BATCH_DELAY):
+    """Wait for one event, then gather more for up to max_delay seconds.
+
+    Debounced events are marked done here; the caller marks the returned
+    ones done once the sink has them.
+    """
+    batch = []
+    event = await queue.get()
+    if debouncer.accept(event):
+        batch.append(event)
+    else:
+        queue.task_done()
+
+    deadline = time.monotonic() + max_delay
+    while len(batch) < max_batch:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            event = await asyncio.wait_for(queue.get(), remaining)
+        except asyncio.TimeoutError:
+            break
+        if debouncer.accept(event):
+            batch.append(event)
+        else:
+            queue.task_done()
+    return batch
+
+
+# ---------------- SINKS ----------------
+class HttpSink:
+    """Posts batches to the Flask app's /hardware/events endpoint."""
+
+    def __init__(self, url, kiosk, timeout=5, room_id=None):
+        self.url = url
+        self.kiosk = kiosk
+        self.timeout = timeout
+        self.room_id = room_id
+
+    def _post(self, batch):
+        payload = {"kiosk": self.kiosk, "events": [event.to_dict() for event in batch]}
+        if self.room_id is not None:
+            payload["room_id"] = self.room_id
+        body = json.dumps(payload).encode("utf-8")
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read() or b"{}")
+
+    async def __call__(self, batch):
+        try:
+            result = await asyncio.to_thread(self._post, batch)
+        except (OSError, ValueError, http.client.HTTPException) as exc:
+            # ValueError: a response that is not JSON, e.g. a proxy's error page.
+            log.error("Could not deliver %d events: %s", len(batch), exc)
+            return
+        for item in result.get("results", []):
+            log.info("%s", item.get("message") or item.get("error"))
+
+
+class QueueSink:
+    """Collects batches in an asyncio queue, for in-process consumers."""
+
+    def __init__(self, maxsize=0):
+        self.batches = asyncio.Queue(maxsize)
+
+    async def __call__(self, batch):
+        await self.batches.put(batch)
+
+
+# ---------------- SERVICE ----------------
+class ReaderService:
+    """Runs every source concurrently and feeds debounced batches to a sink."""
+
+    def __init__(self, sources, sink, debounce_window=DEBOUNCE_WINDOW,
+                 max_batch=MAX_BATCH, max_delay=MAX_BATCH_DELAY):
+        self.sources = sources
+        self.sink = sink
+        self.debouncer = Debouncer(debounce_window)
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue = None
+        self.delivered = 0
+
+    async def _deliver(self):
+        while True:
+            batch = await next_batch(self.queue, self.debouncer, self.max_batch, self.max_delay)
+            if batch:
+                try:
+                    await self.sink(batch)
+                    self.delivered += len(batch)
+                except Exception:
+                    # One bad batch must not stop delivery and let the queue fill.
+                    log.exception("Sink failed on a batch of %d events", len(batch))
+                finally:
+                    for _ in batch:
+                        self.queue.task_done()
+
+    async def run(self):
+        """Run until every source has finished (stdin EOF), then flush."""
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        delivery = asyncio.create_task(self._deliver())
+        readers = [asyncio.create_task(source(self.queue)) for source in self.sources]
+        try:
+            await asyncio.gather(*readers)
+            await self.queue.join()
+        finally:
+            # Cancelling the readers also stops their threads.
+            for task in readers + [delivery]:
+                task.cancel()
+            await asyncio.gather(*readers, delivery, return_exceptions=True)
+
+
+def build_sources(args):
+    sources = []
+    for path in args.rfid:
+        sources.append(lambda queue, path=path: read_device(queue, path, "rfid"))
+    for path in args.barcode:
+        sources.append(lambda queue, path=path: read_device(queue, path, "barcode"))
+    if args.stdin or not sources:
+        sources.append(lambda queue: read_stdin(queue, args.stdin_kind))
+    return sources
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--kiosk", default="kiosk-1", help="kiosk id sent with every batch")
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--room", type=int, help="id of the room this kiosk stands in")
+    parser.add_argument("--rfid", action="append", default=[], help="RFID device or named pipe")
+    parser.add_argument("--barcode", action="append", default=[], help="barcode device or named pipe")
+    parser.add_argument("--stdin", action="store_true", help="also read scans typed on stdin")
+    parser.add_argument("--stdin-kind", choices=EVENT_KINDS, default="barcode")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE_WINDOW)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    service = ReaderService(build_sources(args), HttpSink(args.url, args.kiosk, room_id=args.room), debounce_window=args.debounce)
+    try:
+        asyncio.run(service.run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""Simulated kiosk devices for load testing the reader service.
+
+Replays badge and barcode scans at a target rate, including the bursts of
+duplicate reads real RFID antennas produce. By default the events run
+through an in-process ReaderService and the harness reports throughput and
+how many reads were debounced. With --fifo it writes to a named pipe for an
+external reader_service process. With --url the batches go to a running app.
+
+    python -m hardware.simulator --events 50000 --rate 10000
+    python -m hardware.simulator --fifo /tmp/barcode.fifo --rate 2000
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from hardware.reader_service import HttpSink, ReaderService, ScanEvent
+
+
+def generate_scans(count, badges, barcodes, duplicate_ratio, seed=1):
+    """Yield (kind, value) pairs: a badge, a few tools, repeated per visit."""
+    rng = random.Random(seed)
+    produced = 0
+    while produced < count:
+        visit = [("rfid", rng.choice(badges))]
+        visit += [("barcode", rng.choice(barcodes)) for _ in range(rng.randint(1, 8))]
+        for scan in visit:
+            yield scan
+            produced += 1
+            # Antennas often report one tag several times in a row.
+            while rng.random() < duplicate_ratio and produced < count:
+                yield scan
+                produced += 1
+
+
+async def paced(scans, rate):
+    """Yield scans no faster than `rate` per second, in 10ms slices."""
+    per_slice = max(1, int(rate / 100))
+    started = time.monotonic()
+    sent = 0
+    for scan in scans:
+        yield scan
+        sent += 1
+        if sent % per_slice == 0:
+            delay = started + sent / rate - time.monotonic()
+            await asyncio.sleep(max(0, delay))
+
+
+class CountingSink:
+    def __init__(self):
+        self.batches = 0
+        self.events = 0
+
+    async def __call__(self, batch):
+        self.batches += 1
+        self.events += len(batch)
+
+
+async def run_in_process(args, scans):
+    async def source(queue):
+        async for kind, value in paced(scans, args.rate):
+            await queue.put(ScanEvent(kind, value, "simulator"))
+
+    sink = HttpSink(args.url, args.kiosk) if args.url else CountingSink()
+    service = ReaderService([source], sink, debounce_window=args.debounce)
+    started = time.perf_counter()
+    await service.run()
+    elapsed = time.perf_counter() - started
+
+    print(f"replayed {args.events} scans in {elapsed:.2f}s ({args.events / elapsed:.0f}/s)")
+    print(f"delivered {service.delivered} events, debounced {args.events - service.delivered}")
+    if isinstance(sink, CountingSink):
+        print(f"{sink.batches} batches, {sink.events / max(sink.batches, 1):.1f} events per batch")
+
+
+async def write_fifo(args, scans):
+    with open(args.fifo, "w", buffering=1) as fifo:
+        async for kind, value in paced(scans, args.rate):
+            fifo.write(f"{kind}:{value}\n")
+    print(f"wrote {args.events} scans to {args.fifo}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=50000)
+    parser.add_argument("--rate", type=float, default=10000, help="scans per second")
+    parser.add_argument("--badges", type=int, default=500)
+    parser.add_argument("--tools", type=int, default=5000)
+    parser.add_argument("--duplicates", type=float, default=0.3, help="chance a read is repeated")
+    parser.add_argument("--debounce", type=float, default=0.75)
+    parser.add_argument("--kiosk", default="sim-1")
+    parser.add_argument("--fifo", help="write scans to this named pipe instead")
+    parser.add_argument("--url", help="post batches to a running app, e.g. http://127.0.0.1:5000/hardware/events")
+    args = parser.parse_args(argv)
+
+    badges = [f"{i:06d}" for i in range(args.badges)]
+    barcodes = [f"T{i:06d}" for i in range(args.tools)]
+    scans = generate_scans(args.events, badges, barcodes, args.duplicates)
+
+    if args.fifo:
+        asyncio.run(write_fifo(args, scans))
+    else:
+        asyncio.run(run_in_process(args, scans))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
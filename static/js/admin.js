@@ -1,4 +1,184 @@
 document.addEventListener("DOMContentLoaded", function () {
+    const PAGE_SIZE = 50;
+    const SEARCH_DELAY = 300;  // ms to wait after the last keystroke
+
+    function cell(text) {
+        const td = document.createElement("td");
+        td.textContent = text;
+        return td;
+    }
+
+    function nextLink(response) {
+        const match = /<([^>]+)>;\s*rel="next"/.exec(response.headers.get("Link") || "");
+        return match ? match[1] : null;
+    }
+
+    // A list backed by one of the admin-only, keyset-paginated /admin/api/* endpoints.
+    function pagedList(options) {
+        let nextUrl = null;
+        let query = "";
+        let loaded = false;
+        let controller = null;
+
+        function firstPageUrl() {
+            const params = new URLSearchParams({ limit: PAGE_SIZE, fields: options.fields });
+            if (query) params.set("q", query);
+            return `${options.url}?${params}`;
+        }
+
+        function load(url, append) {
+            if (controller) controller.abort();
+            controller = new AbortController();
+            fetch(url, { signal: controller.signal })
+                .then(response => {
+                    nextUrl = nextLink(response);
+                    return response.json();
+                })
+                .then(rows => {
+                    if (!append) options.container.innerHTML = "";
+                    rows.forEach(row => options.container.appendChild(options.render(row)));
+                    options.more.style.display = nextUrl ? "" : "none";
+                })
+                .catch(error => {
+                    if (error.name !== "AbortError") console.error("Error loading " + options.url, error);
+                });
+        }
+
+        options.more.addEventListener("click", () => nextUrl && load(nextUrl, true));
+
+        if (options.search) {
+            let timer = null;
+            options.search.addEventListener("input", function () {
+                clearTimeout(timer);
+                timer = setTimeout(() => {
+                    query = this.value.trim();
+                    load(firstPageUrl(), false);
+                }, SEARCH_DELAY);
+            });
+        }
+
+        return {
+            ensureLoaded() {
+                if (!loaded) {
+                    loaded = true;
+                    load(firstPageUrl(), false);
+                }
+            }
+        };
+    }
+
+    const usersBody = document.getElementById("users-body");
+    const lists = {
+        "#users-section": pagedList({
+            url: "/admin/api/users",
+            fields: "id,name,rfid,role",
+            container: usersBody,
+            search: document.getElementById("searchUsers"),
+            more: document.getElementById("users-more"),
+            render(user) {
+                const tr = document.createElement("tr");
+                [user.id, user.name, user.rfid, user.role].forEach(value => tr.appendChild(cell(value)));
+
+                const actions = document.createElement("td");
+                const edit = document.createElement("button");
+                edit.className = "btn btn-primary btn-sm edit-user-btn";
+                edit.textContent = "Edit";
+                Object.assign(edit.dataset, { id: user.id, name: user.name, rfid: user.rfid, role: user.role });
+
+                const form = document.createElement("form");
+                form.method = "POST";
+                form.action = usersBody.dataset.deleteUrl;
+                form.className = "d-inline";
+                const hidden = document.createElement("input");
+                hidden.type = "hidden";
+                hidden.name = "user_id";
+                hidden.value = user.id;
+                const remove = document.createElement("button");
+                remove.type = "submit";
+                remove.className = "btn btn-danger btn-sm";
+                remove.textContent = "Delete";
+                form.append(hidden, remove);
+
+                actions.append(edit, " ", form);
+                tr.appendChild(actions);
+                return tr;
+            }
+        }),
+        "#tools-section": pagedList({
+            url: "/admin/api/tools",
+            fields: "id,name,barcode,quantity",
+            container: document.getElementById("tools-body"),
+            search: document.getElementById("searchTools"),
+            more: document.getElementById("tools-more"),
+            render(tool) {
+                const tr = document.createElement("tr");
+                [tool.id, tool.name, tool.barcode].forEach(value => tr.appendChild(cell(value)));
+                const quantity = cell(tool.quantity);
+                quantity.className = "tool-quantity";
+                quantity.dataset.toolId = tool.id;
+                tr.appendChild(quantity);
+                return tr;
+            }
+        }),
+        "#checked-out-section": pagedList({
+            url: "/admin/api/checkedout",
+            fields: "id,tool_name,user_name,checkout_date",
+            container: document.getElementById("checked-out-list"),
+            more: document.getElementById("checked-out-more"),
+            render(item) {
+                const li = document.createElement("li");
+                li.className = "list-group-item";
+                li.textContent = `${item.tool_name} - Checked out by ${item.user_name} on ${item.checkout_date}`;
+                return li;
+            }
+        }),
+        "#rooms-section": pagedList({
+            url: "/admin/api/rooms",
+            fields: "id,name,available,tools,checked_out",
+            container: document.getElementById("rooms-body"),
+            more: document.getElementById("rooms-more"),
+            render(room) {
+                const tr = document.createElement("tr");
+                [room.name, room.available, room.tools, room.checked_out].forEach(value => tr.appendChild(cell(value)));
+                return tr;
+            }
+        })
+    };
+
+    const imageForm = document.getElementById("tool-image-form");
+    imageForm.addEventListener("submit", function (event) {
+        event.preventDefault();
+        const output = document.getElementById("tool-image-result");
+        fetch(this.action, { method: "POST", body: new FormData(this) })
+            .then(response => response.json())
+            .then(result => {
+                output.innerHTML = "";
+                output.className = "mt-2 alert " + (result.error ? "alert-danger" : "alert-success");
+                if (result.image_url) {
+                    const img = document.createElement("img");
+                    img.src = result.image_url;
+                    img.alt = "";
+                    img.className = "tool-thumbnail me-2";
+                    output.appendChild(img);
+                }
+                output.append(result.error || result.message);
+            })
+            .catch(() => output.textContent = "Upload failed.");
+    });
+
+    const transferForm = document.getElementById("transfer-form");
+    transferForm.addEventListener("submit", function (event) {
+        event.preventDefault();
+        const output = document.getElementById("transfer-result");
+        fetch(this.action, { method: "POST", body: new FormData(this) })
+            .then(response => response.json())
+            .then(result => {
+                output.className = "mt-2 alert " + (result.error ? "alert-danger" : "alert-success");
+                output.textContent = result.error || result.message;
+            })
+            .catch(() => output.textContent = "Transfer failed.");
+    });
+
     let tabs = document.querySelectorAll(".nav-tabs .nav-link");
 
     tabs.forEach(tab => {
@@ -13,30 +193,15 @@ document.addEventListener("DOMContentLoaded", function () {
             this.classList.add("active");
 
             // Get target tab-pane ID using data-bs-target
-            let targetPane = document.querySelector(this.getAttribute("data-bs-target"));
+            let target = this.getAttribute("data-bs-target");
+            let targetPane = document.querySelector(target);
             if (targetPane) targetPane.classList.add("show", "active");
-        });
-    });
 
-    // Ensure all tabs are accessible based on role
-    fetch('/api/user_role')
-        .then(response => response.json())
-        .then(data => {
-            if (data.role !== "admin") {
-                document.getElementById("tools-section")?.remove();
-                document.getElementById("rooms-section")?.remove();
-                document.getElementById("checked-out-section")?.remove();
-                document.getElementById("add-users-section")?.remove();
-            }
-        })
-        .catch(error => console.error('Error fetching user role:', error));
-
-    // Live Search for Users
-    document.getElementById("searchUsers").addEventListener("keyup", function () {
-        let filter = this.value.toLowerCase();
-        document.querySelectorAll("#users-section tbody tr").forEach(row => {
-            let name = row.querySelector("td:nth-child(2)").textContent.toLowerCase();
-            row.style.display = name.includes(filter) ? "" : "none";
+            // Tabs fetch their first page only when first opened
+            lists[target]?.ensureLoaded();
         });
     });
+
+    const activeTab = document.querySelector(".nav-tabs .nav-link.active");
+    if (activeTab) lists[activeTab.getAttribute("data-bs-target")]?.ensureLoaded();
 });
@@ -0,0 +1,21 @@
+// Long-polls /events and calls onEvent(kind, data) for each new event, in
+// order. onResync() runs when events were missed (pruned from the server's
+// log) and the page should reload what it shows.
+function followEvents(url, onEvent, onResync) {
+    let after = null;
+
+    function poll() {
+        fetch(after === null ? url : `${url}?after=${after}`, { cache: "no-store" })
+            .then(response => response.json())
+            .then(result => {
+                if (result.resync && onResync) onResync();
+                result.events.forEach(event => onEvent(event.kind, event.data));
+                after = result.last_id;
+                // The server asks busy clients to back off instead of waiting.
+                setTimeout(poll, (result.retry || 0) * 1000);
+            })
+            .catch(() => setTimeout(poll, 5000));
+    }
+
+    poll();
+}
@@ -1,9 +1,11 @@
 document.addEventListener("DOMContentLoaded", function () {
     const rfidInput = document.getElementById("rfid-input");
+    // Rendered into <body data-auto-submit-length> from the admin settings
+    const autoSubmitLength = parseInt(document.body.dataset.autoSubmitLength, 10) || 6;
 
     if (rfidInput) {
         rfidInput.addEventListener("input", function () {
-            if (this.value.length === 6) {
+            if (this.value.length === autoSubmitLength) {
                 document.getElementById("rfid-form").submit();
             }
         });
@@ -0,0 +1,178 @@
+import json
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Each resource maps field names to SQL expressions. Pages are keyed on an
+# integer primary key so every page is an index range scan. Without an admin
+# session only "public_fields" can be requested; a badge tag is the only
+# credential /verify_rfid checks, so users have none.
+RESOURCES = {
+    "tools": {
+        "from": "tools",
+        "key": "tools.id",
+        "fields": {
+            "id": "tools.id",
+            "name": "tools.name",
+            "barcode": "tools.barcode",
+            "quantity": "tools.quantity",
+            "image": "tools.image",
+        },
+        "default_fields": ["id", "name", "quantity"],
+        "public_fields": ["id", "name", "quantity", "image"],
+        "search": {"fts": "tools_fts", "columns": ["tools.name", "tools.barcode"]},
+    },
+    "users": {
+        "from": "users",
+        "key": "users.id",
+        "fields": {
+            "id": "users.id",
+            "name": "users.name",
+            "rfid": "users.rfid_tag",
+            "role": "users.role",
+        },
+        "default_fields": ["id", "name", "rfid"],
+        "public_fields": [],
+        "search": {"fts": "users_fts", "columns": ["users.name", "users.rfid_tag"]},
+    },
+    # Live counts are correlated subqueries over idx_tool_stock_room and
+    # idx_transactions_open_room: one statement per page, no per-room queries.
+    "rooms": {
+        "from": "rooms",
+        "key": "rooms.id",
+        "fields": {
+            "id": "rooms.id",
+            "name": "rooms.name",
+            "available": "(SELECT COALESCE(SUM(quantity), 0) FROM tool_stock WHERE tool_stock.room_id = rooms.id)",
+            "tools": "(SELECT COUNT(*) FROM tool_stock WHERE tool_stock.room_id = rooms.id AND quantity > 0)",
+            "checked_out": "(SELECT COUNT(*) FROM transactions "
+                           "WHERE transactions.room_id = rooms.id AND transactions.return_time IS NULL)",
+        },
+        "default_fields": ["id", "name", "available", "tools", "checked_out"],
+        "public_fields": ["id", "name", "available", "tools", "checked_out"],
+    },
+    "checkedout": {
+        "from": "transactions JOIN tools ON tools.id = transactions.tool_id "
+                "JOIN users ON users.id = transactions.user_id "
+                "LEFT JOIN rooms ON rooms.id = transactions.room_id",
+        "where": "transactions.return_time IS NULL",
+        "key": "transactions.id",
+        "fields": {
+            "id": "transactions.id",
+            "tool_id": "transactions.tool_id",
+            "tool_name": "tools.name",
+            "user_id": "transactions.user_id",
+            "user_name": "users.name",
+            "checkout_date": "transactions.checkout_time",
+            "room_id": "transactions.room_id",
+            "room_name": "rooms.name",
+        },
+        "default_fields": ["id", "tool_name", "user_name", "checkout_date"],
+        "public_fields": ["id", "tool_name", "user_name", "checkout_date", "room_name"],
+    },
+}
+
+
+class ApiError(Exception):
+    """Bad query-string input; rendered as a 400 response."""
+
+
+class ApiForbidden(ApiError):
+    """Needs an admin session; rendered as a 403 response."""
+
+
+def parse_page_args(args, resource, streaming=False, admin=False):
+    """Validate after/limit/fields query parameters for a resource.
+
+    Streaming requests have no default limit; they run to the end of the
+    table unless the caller asks for fewer rows. Non-admins get the
+    resource's public fields only and cannot stream.
+    """
+    spec = RESOURCES[resource]
+    if not admin and (streaming or not spec["public_fields"]):
+        raise ApiForbidden("Admin login required")
+
+    try:
+        after = int(args.get("after", 0))
+        limit = args.get("limit")
+        limit = None if limit is None and streaming else int(limit or DEFAULT_PAGE_SIZE)
+    except ValueError:
+        raise ApiError("after and limit must be integers")
+
+    if limit is not None and not streaming:
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    fields = args.get("fields")
+    if fields:
+        fields = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in fields if field not in spec["fields"]]
+        if unknown:
+            raise ApiError(f"Unknown fields: {', '.join(unknown)}")
+    else:
+        fields = list(spec["default_fields"])
+
+    if not admin:
+        private = [field for field in fields if field not in spec["public_fields"]]
+        if private:
+            raise ApiForbidden(f"Admin login required for fields: {', '.join(private)}")
+
+    # The cursor value is needed to build the next link even if not requested.
+    columns = fields if "id" in fields else fields + ["id"]
+    return after, limit, fields, columns
+
+
+def search_clause(conn, resource, query):
+    """SQL condition and params matching `query` anywhere in the search columns.
+
+    Queries of three or more characters use the trigram FTS5 table kept in
+    sync by triggers (see migrations.admin_search). Shorter ones fall back
+    to a prefix LIKE, and databases without FTS5 to a substring LIKE scan.
+    """
+    spec = RESOURCES[resource]["search"]
+    key = RESOURCES[resource]["key"]
+    has_fts = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (spec["fts"],)
+    ).fetchone()
+
+    if has_fts and len(query) >= 3:
+        phrase = '"' + query.replace('"', '""') + '"'
+        return f"{key} IN (SELECT rowid FROM {spec['fts']} WHERE {spec['fts']} MATCH ?)", [phrase]
+
+    pattern = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    if not has_fts:
+        pattern = "%" + pattern
+    clause = " OR ".join(f"{column} LIKE ? ESCAPE '\\'" for column in spec["columns"])
+    return f"({clause})", [pattern] * len(spec["columns"])
+
+
+def select_page(conn, resource, after, limit, columns, query=None):
+    """Return a cursor over rows with key > after, in key order."""
+    spec = RESOURCES[resource]
+    select = ", ".join(f"{spec['fields'][name]} AS {name}" for name in columns)
+    where = f"{spec['key']} > ?"
+    params = [after]
+    if spec.get("where"):
+        where = f"{spec['where']} AND {where}"
+    if query and "search" in spec:
+        clause, search_params = search_clause(conn, resource, query)
+        where = f"{where} AND {clause}"
+        params.extend(search_params)
+
+    sql = f"SELECT {select} FROM {spec['from']} WHERE {where} ORDER BY {spec['key']}"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return conn.execute(sql, params)
+
+
+def row_to_dict(row, fields):
+    return {field: row[field] for field in fields}
+
+
+def iter_ndjson(cursor, fields, batch_size=500):
+    """Yield newline-delimited JSON, fetching the cursor in batches."""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        yield "".join(json.dumps(row_to_dict(row, fields)) + "\n" for row in rows)
@@ -1,49 +1,253 @@
-import sqlite3
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+
 import bcrypt
 
-DB_NAME = "tool_management.db"
+from database.connection import connection
+from utils.settings import bump_version, read_version
+
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", 12))
+HASH_WORKERS = 2
+# Hashing requests allowed to wait for a worker before new ones are refused.
+MAX_PENDING_HASHES = 16
+HASH_TIMEOUT = 10  # seconds
+
+LOGIN_ATTEMPTS = 5
+LOGIN_WINDOW = 60  # seconds
+MAX_TRACKED_USERNAMES = 10000
+
+DEFAULT_ADMIN = ("admin", "admin123")
+
+
+class AuthBusy(Exception):
+    """Raised when the hashing pool is saturated or too slow; the login can be retried."""
+
+
+# ---------------- PASSWORD HASHING ----------------
+class PasswordHasher:
+    """Runs bcrypt on a small, bounded pool of worker threads.
+
+    bcrypt releases the GIL, so request threads stay responsive while a
+    worker hashes, and at most `workers` cores are ever spent on it.
+    """
+
+    def __init__(self, rounds=BCRYPT_ROUNDS, workers=HASH_WORKERS, max_pending=MAX_PENDING_HASHES):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_pending = max_pending
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_pending)
+
+    def _run(self, fn, *args):
+        if self._pid != os.getpid():
+            # Worker threads do not survive a fork (e.g. gunicorn --preload).
+            self._reset()
+        if not self._slots.acquire(blocking=False):
+            raise AuthBusy("Too many logins in progress, try again shortly")
+        try:
+            return self._executor.submit(fn, *args).result(timeout=HASH_TIMEOUT)
+        except FuturesTimeout:
+            raise AuthBusy("Login is taking too long, try again shortly")
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(lambda: bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(self.rounds)))
+
+    def check(self, password, hashed):
+        if isinstance(hashed, str):
+            hashed = hashed.encode("utf-8")
+        return self._run(bcrypt.checkpw, password.encode("utf-8"), hashed)
+
+
+hasher = PasswordHasher()
+
+
+def configure_hashing(rounds=BCRYPT_ROUNDS, workers=HASH_WORKERS, max_pending=MAX_PENDING_HASHES):
+    """Replace the hashing pool, e.g. with a lower cost factor on slow kiosks."""
+    global hasher
+    hasher = PasswordHasher(rounds, workers, max_pending)
+    return hasher
+
+
+# ---------------- RATE LIMITING ----------------
+class LoginRateLimiter:
+    """Allows `attempts` failed logins per username per sliding `window`.
+
+    At most `max_tracked` usernames are remembered; the one whose last
+    failure is oldest is forgotten first.
+    """
+
+    def __init__(self, attempts=LOGIN_ATTEMPTS, window=LOGIN_WINDOW, max_tracked=MAX_TRACKED_USERNAMES):
+        self.attempts = attempts
+        self.window = window
+        self.max_tracked = max_tracked
+        self._failures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _recent(self, username, now):
+        failures = self._failures.get(username)
+        if failures is None:
+            return None
+        while failures and now - failures[0] >= self.window:
+            failures.popleft()
+        if not failures:
+            del self._failures[username]
+            return None
+        return failures
+
+    def retry_after(self, username):
+        """Seconds until the username may try again, or 0 if allowed now."""
+        now = time.monotonic()
+        with self._lock:
+            failures = self._recent(username, now)
+            if failures is None or len(failures) < self.attempts:
+                return 0
+            return int(self.window - (now - failures[0])) + 1
+
+    def record_failure(self, username):
+        now = time.monotonic()
+        with self._lock:
+            failures = self._failures.get(username)
+            if failures is None:
+                # Only the last `attempts` failures decide whether to block.
+                failures = self._failures[username] = deque(maxlen=self.attempts)
+                if len(self._failures) > self.max_tracked:
+                    self._failures.popitem(last=False)
+            else:
+                self._failures.move_to_end(username)
+            failures.append(now)
+
+    def reset(self, username):
+        with self._lock:
+            self._failures.pop(username, None)
+
+
+rate_limiter = LoginRateLimiter()
+
+
+# ---------------- ADMIN LOOKUP CACHE ----------------
+# Per worker, and versioned like badge_cache: a password change bumps
+# admin_version in the same commit, and every worker drops its copies at
+# most VERSION_CHECK_INTERVAL later.
+ADMIN_VERSION_KEY = "admin_version"
+VERSION_CHECK_INTERVAL = 1.0
+
+_admin_cache = {}
+_admin_cache_lock = threading.Lock()
+_admin_version = None
+_admin_checked_at = 0.0
+
+
+def _get_admin(username):
+    global _admin_version, _admin_checked_at
+    now = time.monotonic()
+    with _admin_cache_lock:
+        current = _admin_version is not None and now - _admin_checked_at < VERSION_CHECK_INTERVAL
+        if current and username in _admin_cache:
+            return _admin_cache[username]
+
+    with connection() as conn:
+        if not current:
+            version = read_version(conn, ADMIN_VERSION_KEY)
+            with _admin_cache_lock:
+                if version != _admin_version:
+                    _admin_cache.clear()
+                    _admin_version = version
+                _admin_checked_at = now
+                if username in _admin_cache:
+                    return _admin_cache[username]
+        row = conn.execute("SELECT id, username, password FROM admins WHERE username = ?", (username,)).fetchone()
+    if row is None:
+        return None  # Misses are not cached, so made-up usernames can't fill memory.
+
+    admin = {"id": row["id"], "username": row["username"], "password": row["password"]}
+    with _admin_cache_lock:
+        _admin_cache[username] = admin
+    return admin
+
+
+def _invalidate_admins(conn):
+    """Bump the shared version as part of the caller's pending write."""
+    global _admin_version
+    bump_version(conn, ADMIN_VERSION_KEY)
+    with _admin_cache_lock:
+        _admin_cache.clear()
+        _admin_version = None
+
+
+# ---------------- ADMIN ACCOUNTS ----------------
+def ensure_default_admin(conn):
+    """Create the default admin account on first start; call at startup."""
+    if conn.execute("SELECT 1 FROM admins LIMIT 1").fetchone():
+        return False
+    username, password = DEFAULT_ADMIN
+    conn.execute("INSERT INTO admins (username, password) VALUES (?, ?)", (username, hasher.hash(password)))
+    _invalidate_admins(conn)
+    conn.commit()
+    return True
+
+
+_dummy_hash = None
+_dummy_hash_lock = threading.Lock()
+
+
+def _unknown_user_hash():
+    """A hash at the current cost, checked for unknown usernames so they take as long as real ones."""
+    global _dummy_hash
+    with _dummy_hash_lock:
+        if _dummy_hash is None or int(_dummy_hash.split(b"$")[2]) != hasher.rounds:
+            _dummy_hash = hasher.hash(os.urandom(16).hex())
+        return _dummy_hash
 
-def get_db_connection():
-    """Connect to SQLite database."""
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    return conn
 
 def login_admin(username, password):
     """Handle admin login."""
-    conn = get_db_connection()
-    admin = conn.execute("SELECT * FROM admins WHERE username = ?", (username,)).fetchone()
+    retry_after = rate_limiter.retry_after(username)
+    if retry_after:
+        return {"error": f"Too many failed attempts. Try again in {retry_after} seconds"}
 
-    if not admin:
-        # If no admin exists, create a default one
-        default_password = bcrypt.hashpw("admin123".encode("utf-8"), bcrypt.gensalt())
-        conn.execute("INSERT INTO admins (username, password) VALUES (?, ?)", ("admin", default_password))
-        conn.commit()
-        conn.close()
-        return {"error": "Default admin created. Please log in with 'admin' / 'admin123'"}
+    admin = _get_admin(username)
+    try:
+        hashed = admin["password"] if admin is not None else _unknown_user_hash()
+        valid = hasher.check(password, hashed) and admin is not None
+    except AuthBusy as exc:
+        return {"error": str(exc)}
 
-    if bcrypt.checkpw(password.encode("utf-8"), admin["password"]):
+    if valid:
+        rate_limiter.reset(username)
         admin_data = {"id": admin["id"], "username": admin["username"]}
-        conn.close()
         return {"message": "Login successful", "admin": admin_data}
     else:
-        conn.close()
+        rate_limiter.record_failure(username)
         return {"error": "Invalid credentials"}
 
+
 def logout_admin():
     """Log out the admin."""
     return {"message": "Logged out successfully"}
 
+
 def change_admin_password(admin_id, new_password):
     """Change an admin’s password."""
     if not new_password or len(new_password) < 6:
         return {"error": "Password must be at least 6 characters long"}
 
-    hashed_password = bcrypt.hashpw(new_password.encode("utf-8"), bcrypt.gensalt())
+    try:
+        hashed_password = hasher.hash(new_password)
+    except AuthBusy as exc:
+        return {"error": str(exc)}
 
-    conn = get_db_connection()
-    conn.execute("UPDATE admins SET password = ? WHERE id = ?", (hashed_password, admin_id))
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        conn.execute("UPDATE admins SET password = ? WHERE id = ?", (hashed_password, admin_id))
+        _invalidate_admins(conn)
+        conn.commit()
 
     return {"message": "Password updated successfully"}
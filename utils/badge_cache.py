@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import OrderedDict
+
+from utils.settings import bump_version, read_version
+
+MAX_BADGES = 50000
+VERSION_KEY = "badge_version"
+# How long a worker trusts its cache before re-reading the shared version.
+VERSION_CHECK_INTERVAL = 1.0
+
+
+class BadgeUser:
+    """The fields of a users row needed to start a kiosk session."""
+
+    __slots__ = ("id", "name", "role", "rfid_tag")
+
+    def __init__(self, id, name, role, rfid_tag):
+        self.id = id
+        self.name = name
+        self.role = role
+        self.rfid_tag = rfid_tag
+
+
+class BadgeCache:
+    """Process-local LRU index of users keyed by rfid_tag.
+
+    Every worker keeps its own copy. Writers bump a counter stored in the
+    settings table (see invalidate()); readers compare it at most once per
+    VERSION_CHECK_INTERVAL and rebuild when it has moved.
+    """
+
+    def __init__(self, max_size=MAX_BADGES, check_interval=VERSION_CHECK_INTERVAL):
+        self.max_size = max_size
+        self.check_interval = check_interval
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+        # True when the whole roster fit, so a miss means "no such badge".
+        self._complete = False
+
+    def warm(self, conn):
+        """(Re)load the roster, keeping at most max_size badges."""
+        version = read_version(conn, VERSION_KEY)
+        rows = conn.execute(
+            "SELECT id, name, role, rfid_tag FROM users ORDER BY id LIMIT ?", (self.max_size + 1,)
+        ).fetchall()
+
+        users = OrderedDict(
+            (row["rfid_tag"], BadgeUser(row["id"], row["name"], row["role"], row["rfid_tag"]))
+            for row in rows[:self.max_size]
+        )
+        with self._lock:
+            self._users = users
+            self._complete = len(rows) <= self.max_size
+            self._version = version
+            self._checked_at = time.monotonic()
+
+    def _ensure_current(self, conn):
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self.check_interval:
+            return
+        if self._version is None or read_version(conn, VERSION_KEY) != self._version:
+            self.warm(conn)
+        else:
+            self._checked_at = now
+
+    def lookup(self, conn, rfid_tag):
+        """Return the BadgeUser for a tag, or None if no user has it."""
+        self._ensure_current(conn)
+
+        with self._lock:
+            user = self._users.get(rfid_tag)
+            if user is not None:
+                self._users.move_to_end(rfid_tag)
+                return user
+            if self._complete:
+                return None
+
+        row = conn.execute("SELECT id, name, role, rfid_tag FROM users WHERE rfid_tag = ?", (rfid_tag,)).fetchone()
+        if row is None:
+            return None
+
+        user = BadgeUser(row["id"], row["name"], row["role"], row["rfid_tag"])
+        with self._lock:
+            self._users[rfid_tag] = user
+            if len(self._users) > self.max_size:
+                self._users.popitem(last=False)
+        return user
+
+    def invalidate(self, conn):
+        """Bump the shared version as part of the caller's pending write.
+
+        Call before conn.commit() so the roster change and the version bump
+        land together; every worker, including this one, then reloads.
+        """
+        bump_version(conn, VERSION_KEY)
+        with self._lock:
+            self._version = None
+
+    def __len__(self):
+        return len(self._users)
+
+
+badge_cache = BadgeCache()
@@ -0,0 +1,309 @@
+"""Bulk import and streaming export of users, tools, rooms, stock and transactions.
+
+Imports read CSV or JSON (an array or one object per line) incrementally,
+validate rows in chunks, and insert each chunk with executemany inside one
+transaction. Duplicate keys are reported per row rather than aborting the
+file. Exports stream straight from a cursor.
+
+    python -m utils.bulk import tools tools.csv
+    python -m utils.bulk export transactions --format csv > transactions.csv
+"""
+import argparse
+import csv
+import io
+import json
+import re
+import sqlite3
+import sys
+
+from database.connection import connection, configure_pool, immediate_transaction
+from utils.badge_cache import badge_cache
+from utils.images import image_cache
+
+CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+READ_SIZE = 64 * 1024
+# Whitespace, commas and the opening bracket between top-level JSON objects.
+SEPARATORS = re.compile(r"[\s,\[]*")
+
+
+def _required(value, column):
+    value = "" if value is None else str(value).strip()
+    if not value:
+        raise ValueError(f"{column} is required")
+    return value
+
+
+def _role(value):
+    value = str(value or "user").strip().lower()
+    if value not in ("user", "admin"):
+        raise ValueError("role must be 'user' or 'admin'")
+    return value
+
+
+def _quantity(value):
+    if value in (None, ""):
+        return 1
+    try:
+        quantity = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("quantity must be a whole number")
+    if quantity < 0:
+        raise ValueError("quantity cannot be negative")
+    return quantity
+
+
+def _optional(value):
+    return (str(value).strip() or None) if value is not None else None
+
+
+# Importable tables: column -> validator, plus the UNIQUE column to dedupe on.
+IMPORT_SPECS = {
+    "users": {
+        "columns": {"name": lambda v: _required(v, "name"), "rfid_tag": lambda v: _required(v, "rfid_tag"),
+                    "role": _role},
+        "unique": "rfid_tag",
+    },
+    "tools": {
+        "columns": {"name": lambda v: _required(v, "name"), "barcode": lambda v: _required(v, "barcode"),
+                    "quantity": _quantity, "image": _optional},
+        "unique": "barcode",
+    },
+    "rooms": {
+        "columns": {"name": lambda v: _required(v, "name")},
+        "unique": "name",
+    },
+}
+
+EXPORT_QUERIES = {
+    "users": "SELECT id, name, rfid_tag, role FROM users ORDER BY id",
+    "tools": "SELECT id, name, barcode, quantity, image FROM tools ORDER BY id",
+    "rooms": "SELECT id, name FROM rooms ORDER BY id",
+    "stock": """
+        SELECT tool_stock.tool_id, tools.barcode, tool_stock.room_id, rooms.name AS room_name, tool_stock.quantity
+        FROM tool_stock
+        JOIN tools ON tools.id = tool_stock.tool_id
+        JOIN rooms ON rooms.id = tool_stock.room_id
+        ORDER BY tool_stock.tool_id, tool_stock.room_id
+    """,
+    "transactions": """
+        SELECT transactions.id, transactions.user_id, users.name AS user_name,
+               transactions.tool_id, tools.name AS tool_name, transactions.room_id,
+               transactions.checkout_time, transactions.return_time
+        FROM transactions
+        LEFT JOIN users ON users.id = transactions.user_id
+        LEFT JOIN tools ON tools.id = transactions.tool_id
+        ORDER BY transactions.id
+    """,
+}
+
+
+# ---------------- PARSING ----------------
+def iter_csv(stream):
+    """Yield (row_number, dict) from a text stream with a header row."""
+    for row_number, row in enumerate(csv.DictReader(stream), start=2):
+        yield row_number, row
+
+
+def iter_json(stream):
+    """Yield (row_number, dict) from a JSON array or newline-delimited objects.
+
+    The input is decoded one object at a time from a rolling buffer, so a
+    large array is never held in memory as a whole.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    row_number = 0
+    eof = False
+
+    while True:
+        pos = SEPARATORS.match(buffer, pos).end()
+        if buffer.startswith("]", pos):
+            return
+        if pos < len(buffer):
+            try:
+                obj, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise ValueError(f"Malformed JSON after row {row_number}")
+            else:
+                row_number += 1
+                yield row_number, obj
+                continue
+        if eof:
+            return
+        chunk = stream.read(READ_SIZE)
+        if not chunk:
+            eof = True
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+
+def iter_rows(stream, fmt):
+    if fmt == "csv":
+        return iter_csv(stream)
+    if fmt in ("json", "ndjson"):
+        return iter_json(stream)
+    raise ValueError(f"Unsupported format {fmt!r}")
+
+
+# ---------------- IMPORT ----------------
+def _insert_chunk(conn, table, spec, chunk, errors):
+    """Insert validated (row_number, values) pairs; returns rows inserted."""
+    columns = list(spec["columns"])
+    unique = spec["unique"]
+    unique_index = columns.index(unique)
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+    with immediate_transaction(conn):
+        keys = [values[unique_index] for _, values in chunk]
+        existing = {
+            row[0] for row in conn.execute(
+                f"SELECT {unique} FROM {table} WHERE {unique} IN ({', '.join('?' * len(keys))})", keys
+            )
+        }
+        clean = []
+        for row_number, values in chunk:
+            if values[unique_index] in existing:
+                errors.append({"row": row_number, "error": f"{unique} {values[unique_index]!r} already exists"})
+            else:
+                clean.append(values)
+
+        try:
+            conn.executemany(sql, clean)
+            inserted = len(clean)
+        except sqlite3.IntegrityError:
+            # Something raced us between the check and the insert; fall back
+            # to row-at-a-time so only the offending rows are rejected.
+            inserted = 0
+            conn.rollback()
+            conn.execute("BEGIN IMMEDIATE")
+            for (row_number, values) in chunk:
+                if values[unique_index] in existing:
+                    continue
+                try:
+                    conn.execute(sql, values)
+                    inserted += 1
+                except sqlite3.IntegrityError as exc:
+                    errors.append({"row": row_number, "error": str(exc)})
+
+        if table == "users" and inserted:
+            badge_cache.invalidate(conn)
+        if table == "tools" and inserted:
+            image_cache.invalidate(conn)
+    return inserted
+
+
+def import_rows(conn, table, rows, chunk_size=CHUNK_SIZE):
+    """Validate and insert (row_number, dict) pairs in chunked transactions."""
+    spec = IMPORT_SPECS[table]
+    unique = spec["unique"]
+    errors = []
+    seen = set()
+    chunk = []
+    imported = 0
+    total = 0
+
+    for row_number, row in rows:
+        total += 1
+        if not isinstance(row, dict):
+            errors.append({"row": row_number, "error": "Expected an object with named columns"})
+            continue
+        try:
+            values = tuple(validate(row.get(column)) for column, validate in spec["columns"].items())
+        except ValueError as exc:
+            errors.append({"row": row_number, "error": str(exc)})
+            continue
+
+        key = values[list(spec["columns"]).index(unique)]
+        if key in seen:
+            errors.append({"row": row_number, "error": f"{unique} {key!r} appears more than once in the file"})
+            continue
+        seen.add(key)
+
+        chunk.append((row_number, values))
+        if len(chunk) >= chunk_size:
+            imported += _insert_chunk(conn, table, spec, chunk, errors)
+            chunk = []
+
+    if chunk:
+        imported += _insert_chunk(conn, table, spec, chunk, errors)
+
+    errors.sort(key=lambda error: error["row"])
+    result = {"message": f"Imported {imported} of {total} {table}", "imported": imported,
+              "failed": len(errors), "errors": errors[:MAX_REPORTED_ERRORS]}
+    return result
+
+
+# ---------------- EXPORT ----------------
+def export_rows(conn, table, fmt="csv", batch_size=1000):
+    """Yield the table as CSV or NDJSON text, batch by batch."""
+    cursor = conn.execute(EXPORT_QUERIES[table])
+    columns = [description[0] for description in cursor.description]
+
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+    elif fmt == "ndjson":
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield "".join(json.dumps(dict(zip(columns, row))) + "\n" for row in rows)
+    else:
+        raise ValueError(f"Unsupported format {fmt!r}")
+
+
+# ---------------- CLI ----------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=None, help="database file (default: tool_management.db)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import", help="import users, tools or rooms")
+    importer.add_argument("table", choices=sorted(IMPORT_SPECS))
+    importer.add_argument("path", help="CSV or JSON file, or - for stdin")
+    importer.add_argument("--format", choices=["csv", "json", "ndjson"])
+
+    exporter = commands.add_parser("export", help="export a table to stdout")
+    exporter.add_argument("table", choices=sorted(EXPORT_QUERIES))
+    exporter.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+
+    args = parser.parse_args(argv)
+    if args.db:
+        configure_pool(args.db)
+
+    with connection() as conn:
+        if args.command == "export":
+            for text in export_rows(conn, args.table, args.format):
+                sys.stdout.write(text)
+            return 0
+
+        fmt = args.format or ("csv" if args.path.endswith(".csv") else "json")
+        stream = sys.stdin if args.path == "-" else open(args.path, newline="", encoding="utf-8-sig")
+        try:
+            result = import_rows(conn, args.table, iter_rows(stream, fmt))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+    for error in result["errors"]:
+        print(f"row {error['row']}: {error['error']}", file=sys.stderr)
+    print(result["message"])
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
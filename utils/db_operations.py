@@ -1,63 +1,49 @@
 import sqlite3
 
-DB_NAME = "tool_management.db"
-
-def get_db_connection():
-    """Connect to SQLite database."""
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    return conn
+from database.connection import connection
+from utils.badge_cache import badge_cache
+from utils.settings import settings_cache
 
 def get_users():
     """Fetch all users from the database."""
-    conn = get_db_connection()
-    users = conn.execute("SELECT id, name, rfid_tag FROM users").fetchall()
-    conn.close()
-    return users
+    with connection() as conn:
+        return conn.execute("SELECT id, name, rfid_tag FROM users").fetchall()
 
 def get_tools():
     """Fetch all tools from the database."""
-    conn = get_db_connection()
-    tools = conn.execute("SELECT id, name, barcode, quantity FROM tools").fetchall()
-    conn.close()
-    return tools
+    with connection() as conn:
+        return conn.execute("SELECT id, name, barcode, quantity FROM tools").fetchall()
 
 def add_user(name, rfid_tag):
     """Add a new user with RFID tag."""
-    conn = get_db_connection()
-    try:
-        conn.execute("INSERT INTO users (name, rfid_tag) VALUES (?, ?)", (name, rfid_tag))
-        conn.commit()
-        return {"message": "User added successfully"}
-    except sqlite3.IntegrityError:
-        return {"error": "RFID tag already exists"}
-    finally:
-        conn.close()
+    with connection() as conn:
+        try:
+            conn.execute("INSERT INTO users (name, rfid_tag) VALUES (?, ?)", (name, rfid_tag))
+            badge_cache.invalidate(conn)
+            conn.commit()
+            return {"message": "User added successfully"}
+        except sqlite3.IntegrityError:
+            conn.rollback()
+            return {"error": "RFID tag already exists"}
 
 def add_tool(name, barcode, quantity):
     """Add a new tool with barcode and quantity."""
-    conn = get_db_connection()
-    try:
-        conn.execute("INSERT INTO tools (name, barcode, quantity) VALUES (?, ?, ?)", (name, barcode, quantity))
-        conn.commit()
-        return {"message": "Tool added successfully"}
-    except sqlite3.IntegrityError:
-        return {"error": "Barcode already exists"}
-    finally:
-        conn.close()
+    with connection() as conn:
+        try:
+            conn.execute("INSERT INTO tools (name, barcode, quantity) VALUES (?, ?, ?)", (name, barcode, quantity))
+            conn.commit()
+            return {"message": "Tool added successfully"}
+        except sqlite3.IntegrityError:
+            conn.rollback()
+            return {"error": "Barcode already exists"}
 
 def update_logout_time(logout_time):
     """Update auto-logout time in settings."""
-    conn = get_db_connection()
-    conn.execute("INSERT INTO settings (key, value) VALUES ('auto_logout_time', ?) ON CONFLICT(key) DO UPDATE SET value=?", 
-                 (logout_time, logout_time))
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        settings_cache.update(conn, auto_logout_time=logout_time)
     return {"message": "Auto-logout time updated successfully"}
 
 def get_logout_time():
     """Fetch auto-logout time from settings."""
-    conn = get_db_connection()
-    logout_time = conn.execute("SELECT value FROM settings WHERE key='auto_logout_time'").fetchone()
-    conn.close()
-    return int(logout_time["value"]) if logout_time else 60  # Default to 60 seconds
+    with connection() as conn:
+        return settings_cache.get(conn, "auto_logout_time")
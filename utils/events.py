@@ -0,0 +1,114 @@
+"""Checkout, return and stock events for open browser pages.
+
+Writers append to the events table inside their own transaction, so an
+event commits together with the change it describes and every worker
+process sees it. Pages long-poll /events?after=<last id>: a request returns
+as soon as newer rows exist, or empty after LONG_POLL_TIMEOUT. /events
+needs no login, so payloads carry tool and room details only, never who
+checked a tool out.
+
+A waiting request holds no database connection: each check borrows one
+from the pool and hands it straight back, so waiters cannot starve the
+kiosks of connections. Only max_waiters requests per worker may sit in
+that wait; the rest are answered at once and asked to retry later, so
+open dashboards can never take every worker thread away from the kiosks.
+"""
+import json
+import threading
+import time
+
+LONG_POLL_TIMEOUT = 20  # seconds
+POLL_INTERVAL = 0.5  # seconds between checks for events committed by other workers
+MAX_WAITERS = 4  # per worker; keep well below gunicorn's `threads`
+RETRY_AFTER = 2  # seconds a client waits when no waiter slot is free
+BATCH_SIZE = 100
+RETAIN_EVENTS = 10000  # rows kept for clients that are catching up
+PRUNE_EVERY = 1000
+
+
+class EventLog:
+    """Append-only event table plus a bounded long-poll over it."""
+
+    def __init__(self, max_waiters=MAX_WAITERS, poll_interval=POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._changed = threading.Condition()
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.configure(max_waiters)
+
+    def configure(self, max_waiters):
+        self.max_waiters = max_waiters
+        self._slots = threading.BoundedSemaphore(max_waiters) if max_waiters > 0 else None
+        return self
+
+    def publish(self, conn, kind, data):
+        """Append an event as part of the caller's pending write; returns its id."""
+        event_id = conn.execute("INSERT INTO events (kind, data) VALUES (?, ?)", (kind, json.dumps(data))).lastrowid
+        if event_id % PRUNE_EVERY == 0:
+            conn.execute("DELETE FROM events WHERE id <= ?", (event_id - RETAIN_EVENTS,))
+        # Local waiters look again now; the row is visible to them once the
+        # caller commits, at the latest on their next POLL_INTERVAL check.
+        with self._changed:
+            self._changed.notify_all()
+        return event_id
+
+    def latest_id(self, conn):
+        return conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+
+    def since(self, conn, after, limit=BATCH_SIZE):
+        rows = conn.execute("SELECT id, kind, data FROM events WHERE id > ? ORDER BY id LIMIT ?", (after, limit))
+        return [{"id": row["id"], "kind": row["kind"], "data": json.loads(row["data"])} for row in rows]
+
+    def poll(self, pool, after, timeout=LONG_POLL_TIMEOUT):
+        """Events newer than `after`, waiting up to `timeout` for the first one.
+
+        Returns {"events", "last_id"}. after=None starts a client at the end
+        of the log. "resync" is set when events the client never saw have
+        been pruned, "retry" (seconds) when no waiter slot was free.
+        `pool` is a ConnectionPool; a connection is held only per check.
+        """
+        conn = pool.acquire()
+        try:
+            if after is None:
+                return {"events": [], "last_id": self.latest_id(conn)}
+            oldest = conn.execute("SELECT MIN(id) FROM events").fetchone()[0]
+            if oldest is not None and after < oldest - 1:
+                return {"events": [], "last_id": self.latest_id(conn), "resync": True}
+            events = self.since(conn, after)
+        finally:
+            pool.release(conn)
+
+        if events or timeout <= 0:
+            return self._page(events, after)
+        if self._slots is None or not self._slots.acquire(blocking=False):
+            return {"events": [], "last_id": after, "retry": RETRY_AFTER}
+
+        with self._lock:
+            self.waiting += 1
+        try:
+            deadline = time.monotonic() + timeout
+            while not events:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                with self._changed:
+                    self._changed.wait(min(self.poll_interval, remaining))
+                conn = pool.acquire()
+                try:
+                    events = self.since(conn, after)
+                finally:
+                    pool.release(conn)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+            self._slots.release()
+        return self._page(events, after)
+
+    def _page(self, events, after):
+        return {"events": events, "last_id": events[-1]["id"] if events else after}
+
+    def __len__(self):
+        return self.waiting
+
+
+event_log = EventLog()
@@ -0,0 +1,278 @@
+"""Tool photos: content-addressed storage, thumbnails and an id -> image map.
+
+Uploads are written to IMAGE_DIR under the first 32 hex digits of their
+SHA-256, so a name always means the same bytes and can be cached by
+browsers forever; uploading the same photo twice stores it once. Each
+original gets one JPEG thumbnail, written next to it the first time it is
+needed. Thumbnails need Pillow; without it the original is served instead.
+
+tools.image holds either a stored name or, for tools created before
+uploads existed, a free-text URL that is passed through unchanged.
+"""
+import hashlib
+import io
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+from utils.settings import bump_version, read_version
+
+IMAGE_DIR = "tool_images"
+THUMBNAIL_SIZE = 320  # pixels, longest side
+THUMBNAIL_QUALITY = 80
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+# A small file can still decode to a huge bitmap; 50 MP admits a 48 MP
+# phone photo and caps a thumbnail decode at a few hundred MB.
+MAX_IMAGE_PIXELS = 50_000_000
+READ_SIZE = 64 * 1024
+
+# Magic numbers of the formats kiosk browsers can show; the upload's file
+# name and Content-Type are not trusted.
+SIGNATURES = (
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
+STORED_NAME = re.compile(r"([0-9a-f]{32})(?:-t(\d+))?\.(jpg|png|gif|webp)")
+
+log = logging.getLogger("images")
+_warned_no_pillow = False
+
+
+def configure(directory, thumbnail_size=THUMBNAIL_SIZE):
+    """Set where images live and how large thumbnails are."""
+    global IMAGE_DIR, THUMBNAIL_SIZE
+    IMAGE_DIR = os.path.abspath(directory)
+    THUMBNAIL_SIZE = int(thumbnail_size)
+    os.makedirs(IMAGE_DIR, exist_ok=True)
+
+
+def sniff(head):
+    """File extension for the image format `head` starts with, or None."""
+    for signature, extension in SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def _pillow():
+    global _warned_no_pillow
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        if not _warned_no_pillow:
+            _warned_no_pillow = True
+            log.warning("Pillow is not installed; serving full-size images instead of thumbnails")
+        return None
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    return Image, ImageOps
+
+
+def _too_many_pixels(path):
+    """Error for an image whose header declares more than MAX_IMAGE_PIXELS, else None.
+
+    Only the header is read. Without Pillow, or for a file Pillow cannot
+    parse, there is nothing to check and thumbnail() serves the original.
+    """
+    pillow = _pillow()
+    if pillow is None:
+        return None
+    Image = pillow[0]
+    limit = f"Images are limited to {MAX_IMAGE_PIXELS // 1_000_000} megapixels"
+    try:
+        with Image.open(path) as image:
+            width, height = image.size
+    except Image.DecompressionBombError:
+        return limit
+    except (OSError, ValueError):
+        return None
+    return limit if width * height > MAX_IMAGE_PIXELS else None
+
+
+# ---------------- STORAGE ----------------
+def save_upload(stream):
+    """Store an uploaded image; returns {"message", "name"} or {"error"}."""
+    digest = hashlib.sha256()
+    size = 0
+    extension = None
+    fd, temp_path = tempfile.mkstemp(dir=IMAGE_DIR, suffix=".upload")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            while True:
+                chunk = stream.read(READ_SIZE)
+                if not chunk:
+                    break
+                if size == 0:
+                    extension = sniff(chunk)
+                    if extension is None:
+                        return {"error": "Upload a JPEG, PNG, GIF or WebP image"}
+                size += len(chunk)
+                if size > MAX_IMAGE_BYTES:
+                    return {"error": f"Images are limited to {MAX_IMAGE_BYTES // (1024 * 1024)} MB"}
+                digest.update(chunk)
+                file.write(chunk)
+        if size == 0:
+            return {"error": "The uploaded file is empty"}
+        error = _too_many_pixels(temp_path)
+        if error:
+            return {"error": error}
+
+        name = f"{digest.hexdigest()[:32]}.{extension}"
+        path = os.path.join(IMAGE_DIR, name)
+        if os.path.exists(path):
+            return {"message": "Image already stored", "name": name}
+        os.replace(temp_path, path)
+        temp_path = None
+    finally:
+        if temp_path is not None:
+            os.unlink(temp_path)
+
+    # Build the thumbnail now so the first kiosk that shows it does not wait.
+    thumbnail(name)
+    return {"message": "Image stored", "name": name}
+
+
+def discard(conn, name):
+    """Delete a stored image and its thumbnail unless a tool still uses it."""
+    if conn.execute("SELECT 1 FROM tools WHERE image = ? LIMIT 1", (name,)).fetchone():
+        return
+    for stored in (name, thumbnail_name(name)):
+        try:
+            os.unlink(os.path.join(IMAGE_DIR, stored))
+        except FileNotFoundError:
+            pass
+
+
+def thumbnail_name(name):
+    match = STORED_NAME.fullmatch(name)
+    return f"{match.group(1)}-t{THUMBNAIL_SIZE}.jpg"
+
+
+def thumbnail(name):
+    """Name of the thumbnail for stored image `name`, creating it if missing.
+
+    Returns the original's name when Pillow is unavailable or the image
+    cannot be decoded, so callers always get something servable.
+    """
+    target = thumbnail_name(name)
+    target_path = os.path.join(IMAGE_DIR, target)
+    if os.path.exists(target_path):
+        return target
+
+    pillow = _pillow()
+    if pillow is None:
+        return name
+    Image, ImageOps = pillow
+    try:
+        with Image.open(os.path.join(IMAGE_DIR, name)) as image:
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+            if image.mode != "RGB":
+                rgba = image.convert("RGBA")
+                image = Image.new("RGB", image.size, "white")
+                image.paste(rgba, mask=rgba)
+            buffer = io.BytesIO()
+            image.save(buffer, "JPEG", quality=THUMBNAIL_QUALITY, optimize=True)
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        log.error("Could not make a thumbnail of %s: %s", name, exc)
+        return name
+
+    # Written under a temporary name so a concurrent worker never serves a
+    # half-written file.
+    fd, temp_path = tempfile.mkstemp(dir=IMAGE_DIR, suffix=".thumb")
+    with os.fdopen(fd, "wb") as file:
+        file.write(buffer.getvalue())
+    os.replace(temp_path, target_path)
+    return target
+
+
+def resolve(image):
+    """(full, thumbnail) for a tools.image value; a legacy URL is used for both.
+
+    A missing thumbnail is made here; if it cannot be, the original is
+    used for both rather than a name that would 404.
+    """
+    if STORED_NAME.fullmatch(image):
+        return image, thumbnail(image)
+    return image, image
+
+
+def locate(name):
+    """Path to serve for a stored name, making a missing thumbnail; None if unknown."""
+    match = STORED_NAME.fullmatch(name)
+    if match is None:
+        return None
+    path = os.path.join(IMAGE_DIR, name)
+    if os.path.exists(path):
+        return path
+    if match.group(2) is None or int(match.group(2)) != THUMBNAIL_SIZE:
+        return None
+    for extension in ("jpg", "png", "gif", "webp"):
+        original = f"{match.group(1)}.{extension}"
+        if os.path.exists(os.path.join(IMAGE_DIR, original)):
+            return path if thumbnail(original) == name else None
+    return None
+
+
+# ---------------- ID -> IMAGE MAP ----------------
+VERSION_KEY = "image_version"
+VERSION_CHECK_INTERVAL = 1.0
+
+
+class ImageCache:
+    """Process-local map of tool id to its (full, thumbnail) image names.
+
+    Only tools with an image are held. Versioned like badge_cache: writers
+    call invalidate() before commit, and every worker reloads within
+    VERSION_CHECK_INTERVAL.
+    """
+
+    def __init__(self, check_interval=VERSION_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._images = {}
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+
+    def warm(self, conn):
+        version = read_version(conn, VERSION_KEY)
+        images = {
+            row["id"]: resolve(row["image"])
+            for row in conn.execute("SELECT id, image FROM tools WHERE image IS NOT NULL AND image != ''")
+        }
+        with self._lock:
+            self._images = images
+            self._version = version
+            self._checked_at = time.monotonic()
+
+    def _ensure_current(self, conn):
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self.check_interval:
+            return
+        if self._version is None or read_version(conn, VERSION_KEY) != self._version:
+            self.warm(conn)
+        else:
+            self._checked_at = now
+
+    def lookup(self, conn, tool_id):
+        """(full, thumbnail) for a tool, or None if it has no image."""
+        self._ensure_current(conn)
+        return self._images.get(tool_id)
+
+    def invalidate(self, conn):
+        """Bump the shared version as part of the caller's pending write."""
+        bump_version(conn, VERSION_KEY)
+        with self._lock:
+            self._version = None
+
+    def __len__(self):
+        return len(self._images)
+
+
+image_cache = ImageCache()
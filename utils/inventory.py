@@ -0,0 +1,92 @@
+"""Per-room stock: where a tool is on the shelf and moving it between rooms.
+
+tool_stock has one row per (tool, room), keyed so that "which rooms have a
+free one" is a primary-key range scan. tools.quantity is kept as the total
+over all rooms by every function that changes stock (here and in
+utils.transactions), so alerts, reports and the tools API keep reading a
+single column.
+"""
+import sqlite3
+
+from database.connection import immediate_transaction
+from utils.events import event_log
+
+
+def list_rooms(conn):
+    """Every room, by name, for room pickers."""
+    return conn.execute("SELECT id, name FROM rooms ORDER BY name").fetchall()
+
+
+def availability(conn, tool_id):
+    """Rooms holding at least one unit of a tool, fullest first."""
+    return conn.execute(
+        """
+        SELECT tool_stock.room_id, rooms.name AS room_name, tool_stock.quantity
+        FROM tool_stock JOIN rooms ON rooms.id = tool_stock.room_id
+        WHERE tool_stock.tool_id = ? AND tool_stock.quantity > 0
+        ORDER BY tool_stock.quantity DESC, rooms.name
+        """,
+        (tool_id,),
+    ).fetchall()
+
+
+def find_available(conn, barcode=None, tool_id=None):
+    """A tool and the rooms it can be picked up from, or None if unknown."""
+    if barcode is not None:
+        tool = conn.execute("SELECT id, name, barcode, quantity FROM tools WHERE barcode = ?", (barcode,)).fetchone()
+    else:
+        tool = conn.execute("SELECT id, name, barcode, quantity FROM tools WHERE id = ?", (tool_id,)).fetchone()
+    if tool is None:
+        return None
+    return {
+        "tool_id": tool["id"], "name": tool["name"], "barcode": tool["barcode"], "quantity": tool["quantity"],
+        "rooms": [dict(row) for row in availability(conn, tool["id"])],
+    }
+
+
+def describe_availability(conn, tool_id):
+    """'Room A (3), Room B (1)' for error messages, or '' if none are free."""
+    return ", ".join(f"{row['room_name']} ({row['quantity']})" for row in availability(conn, tool_id))
+
+
+def transfer_stock(conn, barcode, from_room_id, to_room_id, quantity=1):
+    """Move units of a tool from one room's shelf to another's.
+
+    The source decrement is guarded by CHECK(quantity >= 0), so a transfer
+    can never take more than is on the shelf. Totals do not change.
+    """
+    if quantity < 1:
+        return {"error": "Quantity must be at least 1"}
+    if from_room_id == to_room_id:
+        return {"error": "Choose two different rooms"}
+
+    tool = conn.execute("SELECT id, name FROM tools WHERE barcode = ?", (barcode,)).fetchone()
+    if tool is None:
+        return {"error": "Unknown tool barcode"}
+
+    try:
+        with immediate_transaction(conn):
+            moved = conn.execute(
+                "UPDATE tool_stock SET quantity = quantity - ? WHERE tool_id = ? AND room_id = ? RETURNING quantity",
+                (quantity, tool["id"], from_room_id),
+            ).fetchone()
+            if moved is None:
+                return {"error": f"No {tool['name']} in that room"}
+            conn.execute(
+                """
+                INSERT INTO tool_stock (tool_id, room_id, quantity) VALUES (?, ?, ?)
+                ON CONFLICT (tool_id, room_id) DO UPDATE SET quantity = quantity + excluded.quantity
+                """,
+                (tool["id"], to_room_id, quantity),
+            )
+            event_log.publish(conn, "transfer", {"tool_id": tool["id"], "tool_name": tool["name"],
+                                                 "quantity": quantity, "from_room_id": from_room_id,
+                                                 "to_room_id": to_room_id})
+    except sqlite3.IntegrityError as exc:
+        if "CHECK constraint failed" in str(exc):
+            return {"error": f"Not enough {tool['name']} in that room"}
+        if "FOREIGN KEY constraint failed" in str(exc):
+            return {"error": "Unknown room"}
+        raise
+
+    return {"message": f"Moved {quantity} x {tool['name']}"}
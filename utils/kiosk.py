@@ -0,0 +1,119 @@
+import sqlite3
+import time
+
+from utils import transactions
+from utils.badge_cache import badge_cache
+
+
+class KioskSession:
+    """Who is badged in at a hardware kiosk and what they are doing."""
+
+    __slots__ = ("user_id", "user_name", "mode", "expires_at")
+
+    def __init__(self, user_id, user_name, mode, expires_at):
+        self.user_id = user_id
+        self.user_name = user_name
+        self.mode = mode
+        self.expires_at = expires_at
+
+
+class KioskRegistry:
+    """Turns reader-service events into checkouts and returns.
+
+    A badge read starts a session for that kiosk; barcodes that follow are
+    checked out (or returned) for that user until the session times out.
+    Consecutive checkout scans in one batch commit together as a basket.
+    Sessions live in the kiosk_sessions table, so a badge batch and the
+    barcode batches after it may be handled by different workers.
+    """
+
+    def session(self, conn, kiosk):
+        row = conn.execute(
+            """
+            SELECT kiosk_sessions.user_id, users.name, kiosk_sessions.mode, kiosk_sessions.expires_at
+            FROM kiosk_sessions JOIN users ON users.id = kiosk_sessions.user_id
+            WHERE kiosk_sessions.kiosk = ? AND kiosk_sessions.expires_at >= ?
+            """,
+            (kiosk, time.time()),
+        ).fetchone()
+        return KioskSession(*row) if row else None
+
+    def end_session(self, conn, kiosk):
+        conn.execute("DELETE FROM kiosk_sessions WHERE kiosk = ?", (kiosk,))
+        conn.commit()
+
+    def _save(self, conn, kiosk, current):
+        try:
+            conn.execute(
+                """
+                INSERT INTO kiosk_sessions (kiosk, user_id, mode, expires_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (kiosk) DO UPDATE SET
+                    user_id = excluded.user_id, mode = excluded.mode, expires_at = excluded.expires_at
+                """,
+                (kiosk, current.user_id, current.mode, current.expires_at),
+            )
+            conn.commit()
+        except sqlite3.IntegrityError:
+            # The user was deleted mid-batch; the next scan must badge in again.
+            conn.rollback()
+
+    def handle_events(self, conn, kiosk, events, timeout, room_id=None):
+        """Apply a batch of {"kind", "value"} events; returns one result each.
+
+        `room_id` is the room the kiosk stands in: checkouts come off its
+        shelves and returns go back onto them.
+        """
+        results = []
+        basket = []
+
+        def flush(current):
+            if basket:
+                results.extend(transactions.checkout_basket(conn, current.user_id, basket, room_id)["items"])
+                basket.clear()
+
+        current = self.session(conn, kiosk)
+        for event in events:
+            kind = event.get("kind")
+            value = str(event.get("value", "")).strip()
+
+            if kind == "rfid":
+                if current:
+                    flush(current)
+                user = badge_cache.lookup(conn, value)
+                if user is None:
+                    results.append({"rfid": value, "error": "RFID not recognized"})
+                    continue
+                mode = current.mode if current and current.user_id == user.id else "checkout"
+                current = KioskSession(user.id, user.name, mode, 0)
+                results.append({"rfid": value, "message": f"Welcome, {user.name}"})
+
+            elif kind == "mode":
+                if current is None or value not in ("checkout", "return"):
+                    results.append({"mode": value, "error": "Scan a badge, then choose checkout or return"})
+                    continue
+                flush(current)
+                current.mode = value
+                results.append({"mode": value, "message": f"Mode set to {value}"})
+
+            elif kind == "barcode":
+                if current is None:
+                    results.append({"barcode": value, "error": "Scan your badge first"})
+                elif current.mode == "checkout":
+                    basket.append(value)
+                else:
+                    flush(current)
+                    results.append(dict(transactions.return_tool(conn, current.user_id, value, room_id), barcode=value))
+
+            else:
+                results.append({"error": f"Unknown event kind {kind!r}"})
+
+            if current:
+                current.expires_at = time.time() + timeout
+
+        if current:
+            flush(current)
+            self._save(conn, kiosk, current)
+        return results
+
+
+kiosk_registry = KioskRegistry()
@@ -0,0 +1,181 @@
+"""Request, SQLite and template timings, exposed in Prometheus text format.
+
+Values are kept per process: with several gunicorn workers each one
+serves its own numbers at /metrics, so scrape every worker (or run one
+worker per port) if you need complete totals.
+
+Query timing comes from database.connection.TimedConnection and its
+cursors, which include the time spent fetching rows; they are only used
+once init_app has installed an observer. Profiling wraps the WSGI app
+in werkzeug's ProfilerMiddleware and is not installed unless PROFILE_DIR
+is set, so it costs nothing when off.
+"""
+import bisect
+import logging
+import threading
+import time
+
+from flask import g, request, template_rendered, before_render_template
+
+from database.connection import set_query_observer
+
+# Seconds; the same buckets serve requests, queries and templates.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+slow_query_log = logging.getLogger("slow_queries")
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = list(self._values.items())
+        for label_values, value in sorted(values):
+            yield f"{self.name}{_labels(self.labels, label_values)} {value}"
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        # Per-bucket (not cumulative) counts, then sum and count.
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            snapshot = [(label_values, list(series)) for label_values, series in self._series.items()]
+        for label_values, series in sorted(snapshot):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                labels = _labels(self.labels + ("le",), label_values + (str(bound),))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _labels(self.labels, label_values)
+            yield f"{self.name}_sum{labels} {series[-2]}"
+            yield f"{self.name}_count{labels} {series[-1]}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+request_seconds = Histogram("tool_http_request_duration_seconds", "Time to build each response.",
+                            ("endpoint", "method", "status"))
+request_queries = Histogram("tool_http_request_db_queries", "SQLite statements run per request.",
+                            ("endpoint",), QUERY_COUNT_BUCKETS)
+request_db_seconds = Histogram("tool_http_request_db_seconds", "Time spent in SQLite per request.", ("endpoint",))
+query_seconds = Histogram("tool_db_query_duration_seconds", "SQLite statement time.", ("statement",))
+slow_queries = Counter("tool_db_slow_queries_total", "Statements slower than SLOW_QUERY_MS.", ("statement",))
+template_seconds = Histogram("tool_template_render_seconds", "Jinja template render time.", ("template",))
+
+REGISTRY = [request_seconds, request_queries, request_db_seconds, query_seconds, slow_queries, template_seconds]
+
+
+# ---------------- COLLECTION ----------------
+class _ThreadStats(threading.local):
+    queries = 0
+    db_seconds = 0.0
+    template_started = None
+
+
+_stats = _ThreadStats()
+_slow_query_seconds = None
+
+
+def observe_query(sql, seconds):
+    """Query observer installed into database.connection."""
+    statement = sql.split(None, 1)[0].upper() if sql.strip() else ""
+    query_seconds.observe(seconds, statement)
+    _stats.queries += 1
+    _stats.db_seconds += seconds
+    if _slow_query_seconds is not None and seconds >= _slow_query_seconds:
+        slow_queries.inc(statement)
+        slow_query_log.warning("%.1f ms: %s", seconds * 1000, " ".join(sql.split()))
+
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+    _stats.queries = 0
+    _stats.db_seconds = 0.0
+
+
+def _after_request(response):
+    started = g.pop("metrics_started", None)
+    if started is not None:
+        endpoint = request.endpoint or "unmatched"
+        request_seconds.observe(time.perf_counter() - started, endpoint, request.method, response.status_code)
+        request_queries.observe(_stats.queries, endpoint)
+        request_db_seconds.observe(_stats.db_seconds, endpoint)
+    return response
+
+
+def _template_started(sender, template, context, **extra):
+    _stats.template_started = time.perf_counter()
+
+
+def _template_finished(sender, template, context, **extra):
+    if _stats.template_started is not None:
+        template_seconds.observe(time.perf_counter() - _stats.template_started, template.name or "string")
+        _stats.template_started = None
+
+
+def render():
+    """Every metric in Prometheus text exposition format."""
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+def init_app(app):
+    """Install the request hooks, query observer and optional profiler."""
+    global _slow_query_seconds
+    if app.config["PROFILE_DIR"]:
+        # One .prof file per request; inspect with snakeviz or pstats.
+        from werkzeug.middleware.profiler import ProfilerMiddleware
+        app.wsgi_app = ProfilerMiddleware(app.wsgi_app, stream=None, profile_dir=app.config["PROFILE_DIR"])
+
+    if not app.config["METRICS"]:
+        # The observer is process-wide; don't keep timing for an earlier app.
+        set_query_observer(None)
+        return
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
+
+    slow_ms = app.config["SLOW_QUERY_MS"]
+    _slow_query_seconds = slow_ms / 1000 if slow_ms else None
+    set_query_observer(observe_query)
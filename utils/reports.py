@@ -0,0 +1,312 @@
+"""Usage reports built from incrementally maintained rollup tables.
+
+Triggers on `transactions` append every checkout and return to rollup_log
+(see migrations.usage_rollups). refresh() folds log entries past the
+high-water mark into hourly and daily summary rows, so dashboards read a
+few hundred precomputed rows instead of scanning the whole history.
+Buckets are local days and hours in transactions.TIMEZONE.
+
+The alert scheduler runs refresh() every tick. The reports page folds in
+at most REQUEST_REFRESH_BATCHES batches so it stays fast while a large
+backlog (e.g. the history queued by the rollup migration) is worked off
+in the background, and says how many entries are still pending. To
+catch up in one go:
+
+    python -m utils.reports refresh
+"""
+import argparse
+import sys
+from collections import defaultdict
+from functools import lru_cache
+from datetime import datetime, time as dt_time, timedelta
+
+import pytz
+
+from database.connection import configure_pool, connection, immediate_transaction
+from utils import transactions
+
+HIGH_WATER_KEY = "report_rollup_id"
+REFRESH_BATCH = 5000
+REQUEST_REFRESH_BATCHES = 4  # per /reports request; ~0.4 s on a cold backlog
+DEFAULT_RANGE_DAYS = 30
+TOP_BORROWERS = 10
+# Widest gap between a stored wall-clock time and UTC (UTC+14), plus a
+# second for the fractional part the cutoff drops.
+MAX_UTC_OFFSET = timedelta(hours=14, seconds=1)
+
+UPSERT_HOURLY = """
+    INSERT INTO usage_hourly (day, hour, checkouts, returns) VALUES (?, ?, ?, ?)
+    ON CONFLICT(day, hour) DO UPDATE SET
+        checkouts = checkouts + excluded.checkouts,
+        returns = returns + excluded.returns
+"""
+UPSERT_DAILY = """
+    INSERT INTO usage_daily (day, tool_id, checkouts, returns, busy_seconds, duration_seconds)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(day, tool_id) DO UPDATE SET
+        checkouts = checkouts + excluded.checkouts,
+        returns = returns + excluded.returns,
+        busy_seconds = busy_seconds + excluded.busy_seconds,
+        duration_seconds = duration_seconds + excluded.duration_seconds
+"""
+UPSERT_DAILY_USERS = """
+    INSERT INTO usage_daily_users (day, user_id, checkouts, returns, duration_seconds) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(day, user_id) DO UPDATE SET
+        checkouts = checkouts + excluded.checkouts,
+        returns = returns + excluded.returns,
+        duration_seconds = duration_seconds + excluded.duration_seconds
+"""
+
+
+# ---------------- TIME BUCKETS ----------------
+def parse_timestamp(value):
+    """Parse a stored checkout/return time into an aware local datetime.
+
+    Naive values come from the column's CURRENT_TIMESTAMP default, which is
+    UTC; SQLite's julianday() reads them the same way.
+    """
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = pytz.utc.localize(parsed)
+    return parsed.astimezone(transactions.TIMEZONE)
+
+
+def julian_day(moment):
+    """An aware datetime as a julian day number, to compare with julianday() in SQL."""
+    return moment.timestamp() / 86400 + 2440587.5
+
+
+@lru_cache(maxsize=4096)
+def _midnight(zone, day):
+    return zone.localize(datetime.combine(day, dt_time()))
+
+
+def local_midnight(day):
+    # pytz's localize() dominates a backfill without the cache.
+    return _midnight(transactions.TIMEZONE, day)
+
+
+def split_by_day(start, end):
+    """Yield (local_day, seconds) for each local day the interval overlaps."""
+    day = start.date()
+    while start < end:
+        next_midnight = local_midnight(day + timedelta(days=1))
+        stop = min(end, next_midnight)
+        yield day.isoformat(), (stop - start).total_seconds()
+        start, day = stop, day + timedelta(days=1)
+
+
+def day_range(start_date=None, end_date=None):
+    """Inclusive local date range; defaults to the last DEFAULT_RANGE_DAYS days."""
+    today = datetime.now(transactions.TIMEZONE).date()
+    end_date = end_date or today
+    start_date = start_date or end_date - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    return start_date, end_date
+
+
+# ---------------- ROLLUP ----------------
+def _apply_batch(conn, entries):
+    hourly = defaultdict(lambda: [0, 0])
+    daily = defaultdict(lambda: [0, 0, 0.0, 0.0])
+    daily_users = defaultdict(lambda: [0, 0, 0.0])
+
+    for entry in entries:
+        if entry["tool_id"] is None:
+            continue  # the transaction was deleted with its tool
+        try:
+            checked_out = parse_timestamp(entry["checkout_time"])
+            returned = parse_timestamp(entry["return_time"]) if entry["kind"] == "return" else None
+        except (TypeError, ValueError):
+            continue  # a hand-edited timestamp must not wedge the rollup
+
+        if returned is None:
+            day = checked_out.date().isoformat()
+            hourly[day, checked_out.hour][0] += 1
+            daily[day, entry["tool_id"]][0] += 1
+            daily_users[day, entry["user_id"]][0] += 1
+            continue
+
+        duration = max(0.0, (returned - checked_out).total_seconds())
+        day = returned.date().isoformat()
+        hourly[day, returned.hour][1] += 1
+        daily[day, entry["tool_id"]][1] += 1
+        daily[day, entry["tool_id"]][3] += duration
+        daily_users[day, entry["user_id"]][1] += 1
+        daily_users[day, entry["user_id"]][2] += duration
+        for busy_day, seconds in split_by_day(checked_out, returned):
+            daily[busy_day, entry["tool_id"]][2] += seconds
+
+    conn.executemany(UPSERT_HOURLY, [(*key, *values) for key, values in hourly.items()])
+    conn.executemany(UPSERT_DAILY, [(*key, *values) for key, values in daily.items()])
+    conn.executemany(UPSERT_DAILY_USERS, [(*key, *values) for key, values in daily_users.items()])
+
+
+def refresh(conn, batch_size=REFRESH_BATCH, max_batches=None):
+    """Fold new rollup_log entries into the summary tables; returns entries applied.
+
+    Each batch is its own short write transaction, and the high-water mark
+    moves in the same commit, so concurrent refreshes never double count.
+    Stops after `max_batches` batches if given, leaving the rest pending.
+    """
+    applied = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        batches += 1
+        with immediate_transaction(conn):
+            row = conn.execute("SELECT value FROM settings WHERE key = ?", (HIGH_WATER_KEY,)).fetchone()
+            high_water = int(row["value"]) if row else 0
+            entries = conn.execute("""
+                SELECT rollup_log.id, rollup_log.kind, transactions.user_id, transactions.tool_id,
+                       transactions.checkout_time, transactions.return_time
+                FROM rollup_log
+                LEFT JOIN transactions ON transactions.id = rollup_log.transaction_id
+                WHERE rollup_log.id > ?
+                ORDER BY rollup_log.id
+                LIMIT ?
+            """, (high_water, batch_size)).fetchall()
+            if not entries:
+                return applied
+
+            _apply_batch(conn, entries)
+            high_water = entries[-1]["id"]
+            conn.execute(
+                "INSERT INTO settings (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (HIGH_WATER_KEY, high_water),
+            )
+            conn.execute("DELETE FROM rollup_log WHERE id <= ?", (high_water,))
+        applied += len(entries)
+        if len(entries) < batch_size:
+            return applied
+    return applied
+
+
+def pending(conn):
+    """Rollup log entries not yet folded into the summary tables."""
+    return conn.execute("SELECT COUNT(*) FROM rollup_log").fetchone()[0]
+
+
+# ---------------- REPORTS ----------------
+def tool_utilization(conn, start_date, end_date):
+    """Per-tool checkouts, mean checkout duration and share of unit-time in use.
+
+    Only tools used in the range (or out right now) are listed. Returned
+    loans come from usage_daily and loans still out are added from the
+    open transactions, all in one query, so no timestamp is parsed in
+    Python. Capacity is the tool's stock on hand plus the units currently out.
+    """
+    period_start = local_midnight(start_date)
+    period_end = min(local_midnight(end_date + timedelta(days=1)), datetime.now(transactions.TIMEZONE))
+    rows = conn.execute("""
+        SELECT totals.*, tools.name AS tool_name, tools.quantity,
+               COALESCE(totals.busy_seconds / ((tools.quantity + totals.out) * :period_seconds), 0.0) AS utilization,
+               totals.duration_seconds / totals.returns / 3600 AS mean_duration_hours
+        FROM (
+            SELECT tool_id, SUM(checkouts) AS checkouts, SUM(returns) AS returns, TOTAL(busy_seconds) AS busy_seconds,
+                   TOTAL(duration_seconds) AS duration_seconds, SUM(out) AS out
+            FROM (
+                SELECT tool_id, checkouts, returns, busy_seconds, duration_seconds, 0 AS out
+                FROM usage_daily WHERE day BETWEEN :first_day AND :last_day
+                UNION ALL
+                SELECT tool_id, 0, 0, MAX(0.0, :end - MAX(julianday(checkout_time), :start)) * 86400, 0, 1
+                FROM transactions WHERE return_time IS NULL
+            )
+            GROUP BY tool_id
+        ) AS totals
+        JOIN tools ON tools.id = totals.tool_id
+        ORDER BY utilization DESC, totals.checkouts DESC
+    """, {
+        "first_day": start_date.isoformat(),
+        "last_day": end_date.isoformat(),
+        "start": julian_day(period_start),
+        "end": julian_day(period_end),
+        "period_seconds": max((period_end - period_start).total_seconds(), 1.0),
+    })
+    return [dict(row) for row in rows]
+
+
+def overdue_checkouts(conn, hours):
+    """Open checkouts older than `hours`, longest out first.
+
+    Stored times are local wall clock with an offset, or naive UTC, so a
+    text comparison against a cutoff pushed MAX_UTC_OFFSET later keeps
+    every overdue row while reading only the head of idx_transactions_open;
+    julianday() then applies the exact limit.
+    """
+    cutoff = datetime.now(pytz.utc) - timedelta(hours=hours) + MAX_UTC_OFFSET
+    rows = conn.execute("""
+        SELECT loans.*, tools.name AS tool_name, users.name AS user_name
+        FROM (
+            SELECT id, tool_id, user_id, checkout_time,
+                   (julianday('now') - julianday(checkout_time)) * 24 AS hours_out
+            FROM transactions WHERE return_time IS NULL AND checkout_time < ?
+        ) AS loans
+        JOIN tools ON tools.id = loans.tool_id
+        JOIN users ON users.id = loans.user_id
+        WHERE loans.hours_out >= ?
+        ORDER BY loans.hours_out DESC
+    """, (cutoff.strftime("%Y-%m-%d %H:%M:%S"), hours))
+    return [dict(row) for row in rows]
+
+
+def top_borrowers(conn, start_date, end_date, limit=TOP_BORROWERS):
+    """Users with the most checkouts in the range."""
+    return conn.execute("""
+        SELECT totals.*, users.name AS user_name
+        FROM (
+            SELECT user_id, SUM(checkouts) AS checkouts, SUM(duration_seconds) / 3600.0 AS hours_borrowed
+            FROM usage_daily_users WHERE day BETWEEN ? AND ? GROUP BY user_id
+            ORDER BY checkouts DESC, hours_borrowed DESC
+            LIMIT ?
+        ) AS totals
+        JOIN users ON users.id = totals.user_id
+        ORDER BY totals.checkouts DESC, totals.hours_borrowed DESC
+    """, (start_date.isoformat(), end_date.isoformat(), limit)).fetchall()
+
+
+def peak_hours(conn, start_date, end_date):
+    """7x24 grid of checkouts by local weekday (0 = Sunday) and hour."""
+    grid = [[0] * 24 for _ in range(7)]
+    for row in conn.execute("""
+        SELECT CAST(strftime('%w', day) AS INTEGER) AS weekday, hour, SUM(checkouts) AS checkouts
+        FROM usage_hourly WHERE day BETWEEN ? AND ? GROUP BY weekday, hour
+    """, (start_date.isoformat(), end_date.isoformat())):
+        grid[row["weekday"]][row["hour"]] = row["checkouts"]
+    return grid
+
+
+def build_report(conn, start_date=None, end_date=None, overdue_hours=24,
+                 refresh_batches=REQUEST_REFRESH_BATCHES):
+    """Everything the reports page shows, after a bounded rollup refresh.
+
+    "pending" counts log entries the rollups have not caught up with yet.
+    """
+    refresh(conn, max_batches=refresh_batches)
+    start_date, end_date = day_range(start_date, end_date)
+    return {
+        "pending": pending(conn),
+        "start_date": start_date,
+        "end_date": end_date,
+        "tools": tool_utilization(conn, start_date, end_date),
+        "overdue": overdue_checkouts(conn, overdue_hours),
+        "borrowers": top_borrowers(conn, start_date, end_date),
+        "heatmap": peak_hours(conn, start_date, end_date),
+    }
+
+
+# ---------------- CLI ----------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=None, help="database file (default: tool_management.db)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("refresh", help="fold new checkouts and returns into the rollup tables")
+    args = parser.parse_args(argv)
+    if args.db:
+        configure_pool(args.db)
+
+    with connection() as conn:
+        print(f"Applied {refresh(conn)} rollup entries")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
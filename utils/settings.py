@@ -0,0 +1,104 @@
+import threading
+import time
+
+VERSION_KEY = "settings_version"
+VERSION_CHECK_INTERVAL = 1.0
+
+# Typed defaults for every admin-editable setting.
+DEFAULTS = {
+    "auto_logout_time": 60,
+    "auto_submit_length": 6,
+    "overdue_hours": 24,
+    "low_stock_threshold": 0,
+}
+
+
+def read_version(conn, key):
+    """Read a cache version counter stored in the settings table."""
+    row = conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+    return int(row["value"]) if row else 0
+
+
+def bump_version(conn, key):
+    """Increment a cache version counter as part of the caller's transaction."""
+    conn.execute(
+        "INSERT INTO settings (key, value) VALUES (?, 1) "
+        "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1",
+        (key,),
+    )
+
+
+class SettingsCache:
+    """In-memory copy of the settings table, reloaded only when it changes.
+
+    update() bumps settings_version in the same commit as the new values;
+    other workers notice at most VERSION_CHECK_INTERVAL later.
+    """
+
+    def __init__(self, defaults=DEFAULTS, check_interval=VERSION_CHECK_INTERVAL):
+        self.defaults = dict(defaults)
+        self.check_interval = check_interval
+        self._values = dict(defaults)
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+
+    def _coerce(self, key, value):
+        default = self.defaults[key]
+        try:
+            return type(default)(value)
+        except (TypeError, ValueError):
+            return default
+
+    def load(self, conn):
+        """Reload every known setting from the database."""
+        version = read_version(conn, VERSION_KEY)
+        placeholders = ", ".join("?" * len(self.defaults))
+        rows = conn.execute(
+            f"SELECT key, value FROM settings WHERE key IN ({placeholders})", list(self.defaults)
+        ).fetchall()
+
+        values = dict(self.defaults)
+        for row in rows:
+            values[row["key"]] = self._coerce(row["key"], row["value"])
+
+        with self._lock:
+            self._values = values
+            self._version = version
+            self._checked_at = time.monotonic()
+
+    def _ensure_current(self, conn):
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self.check_interval:
+            return
+        if self._version is None or read_version(conn, VERSION_KEY) != self._version:
+            self.load(conn)
+        else:
+            self._checked_at = now
+
+    def get(self, conn, key):
+        """Return one typed setting."""
+        self._ensure_current(conn)
+        return self._values[key]
+
+    def all(self, conn):
+        """Return a copy of every setting as a dict."""
+        self._ensure_current(conn)
+        return dict(self._values)
+
+    def update(self, conn, **values):
+        """Write new values and publish them to every worker, then commit."""
+        unknown = set(values) - set(self.defaults)
+        if unknown:
+            raise KeyError(f"Unknown settings: {', '.join(sorted(unknown))}")
+
+        conn.executemany(
+            "INSERT INTO settings (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            [(key, self._coerce(key, value)) for key, value in values.items() if value is not None],
+        )
+        bump_version(conn, VERSION_KEY)
+        conn.commit()
+        self.load(conn)
+
+
+settings_cache = SettingsCache()
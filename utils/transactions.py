@@ -0,0 +1,281 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytz
+
+from database.connection import immediate_transaction
+from utils import inventory
+from utils.events import event_log
+
+TIMEZONE = pytz.timezone("America/New_York")
+
+
+def configure_timezone(name):
+    """Set the zone checkout and return times are recorded in."""
+    global TIMEZONE
+    TIMEZONE = pytz.timezone(name)
+    return TIMEZONE
+
+
+def current_timestamp():
+    """Timestamp in the shop's timezone, in the format stored in transactions."""
+    return datetime.now(TIMEZONE).isoformat(sep=" ", timespec="microseconds")
+
+
+# A user deleted while their kiosk session is still open fails the
+# transactions.user_id foreign key.
+UNKNOWN_USER = "Your badge is no longer registered; scan it again or ask an admin"
+
+
+def _out_of_stock(conn, tool, room_id):
+    """Error for an empty shelf, pointing at rooms that still have one."""
+    if room_id is None:
+        return {"error": "Tool is out of stock"}
+    elsewhere = inventory.describe_availability(conn, tool["id"])
+    if elsewhere:
+        return {"error": f"No {tool['name']} left in this room; available in {elsewhere}"}
+    return {"error": "Tool is out of stock"}
+
+
+def checkout_tool(conn, user_id, barcode, room_id=None):
+    """Take one unit of a tool off a room's shelf and open a transaction for the user.
+
+    Without a room the unit comes from the room holding the most. The
+    decrement is a single UPDATE guarded by the CHECK(quantity >= 0)
+    constraint, so concurrent kiosks can never oversell the last unit.
+    """
+    tool = conn.execute("SELECT id, name FROM tools WHERE barcode = ?", (barcode,)).fetchone()
+    if tool is None:
+        return {"error": "Unknown tool barcode"}
+
+    try:
+        with immediate_transaction(conn):
+            if room_id is None:
+                fullest = conn.execute(
+                    "SELECT room_id FROM tool_stock WHERE tool_id = ? AND quantity > 0 "
+                    "ORDER BY quantity DESC, room_id LIMIT 1",
+                    (tool["id"],),
+                ).fetchone()
+                if fullest is None:
+                    return _out_of_stock(conn, tool, None)
+                shelf = fullest["room_id"]
+            else:
+                shelf = room_id
+
+            taken = conn.execute(
+                "UPDATE tool_stock SET quantity = quantity - 1 WHERE tool_id = ? AND room_id = ? RETURNING room_id",
+                (tool["id"], shelf),
+            ).fetchone()
+            if taken is None:
+                return _out_of_stock(conn, tool, room_id)
+
+            tool = conn.execute(
+                "UPDATE tools SET quantity = quantity - 1 WHERE id = ? RETURNING id, name, quantity",
+                (tool["id"],),
+            ).fetchone()
+            conn.execute(
+                "INSERT INTO transactions (user_id, tool_id, room_id, checkout_time) VALUES (?, ?, ?, ?)",
+                (user_id, tool["id"], shelf, current_timestamp()),
+            )
+            event_log.publish(conn, "checkout", {"tool_id": tool["id"], "tool_name": tool["name"],
+                                                 "quantity": tool["quantity"], "room_id": shelf, "count": 1})
+    except sqlite3.IntegrityError as exc:
+        if "FOREIGN KEY constraint failed" in str(exc):
+            return {"error": UNKNOWN_USER}
+        if "CHECK constraint failed" not in str(exc):
+            raise
+        return _out_of_stock(conn, tool, room_id)
+
+    return {"message": f"Checked out {tool['name']}", "tool_id": tool["id"], "quantity": tool["quantity"],
+            "room_id": shelf}
+
+
+def return_tool(conn, user_id, barcode, room_id=None):
+    """Close the user's oldest open transaction for a tool and restock it.
+
+    The unit goes back to `room_id`, or else to the room it was taken from
+    (the first room for checkouts recorded before rooms were tracked).
+    """
+    try:
+        with immediate_transaction(conn):
+            closed = conn.execute(
+                """
+                UPDATE transactions SET return_time = ?
+                WHERE id = (
+                    SELECT transactions.id FROM transactions
+                    JOIN tools ON tools.id = transactions.tool_id
+                    WHERE tools.barcode = ? AND transactions.user_id = ?
+                      AND transactions.return_time IS NULL
+                    ORDER BY transactions.checkout_time, transactions.id
+                    LIMIT 1
+                )
+                RETURNING tool_id, room_id
+                """,
+                (current_timestamp(), barcode, user_id),
+            ).fetchone()
+            if closed is None:
+                return {"error": "You have no open checkout for this tool"}
+
+            shelf = room_id or closed["room_id"] or conn.execute("SELECT MIN(id) FROM rooms").fetchone()[0]
+            conn.execute(
+                """
+                INSERT INTO tool_stock (tool_id, room_id, quantity) VALUES (?, ?, 1)
+                ON CONFLICT (tool_id, room_id) DO UPDATE SET quantity = quantity + 1
+                """,
+                (closed["tool_id"], shelf),
+            )
+            tool = conn.execute(
+                "UPDATE tools SET quantity = quantity + 1 WHERE id = ? RETURNING id, name, quantity",
+                (closed["tool_id"],),
+            ).fetchone()
+            event_log.publish(conn, "return", {"tool_id": tool["id"], "tool_name": tool["name"],
+                                               "quantity": tool["quantity"], "room_id": shelf, "count": 1})
+    except sqlite3.IntegrityError as exc:
+        if "FOREIGN KEY constraint failed" not in str(exc) and "NOT NULL constraint failed" not in str(exc):
+            raise
+        return {"error": "Unknown room"}
+
+    return {"message": f"Returned {tool['name']}", "tool_id": tool["id"], "quantity": tool["quantity"],
+            "room_id": shelf}
+
+
+MAX_BASKET_SIZE = 100
+
+
+def checkout_basket(conn, user_id, barcodes, room_id=None):
+    """Check out a whole basket of scanned barcodes with a single commit.
+
+    All barcodes and their shelves are resolved with one IN (...) lookup
+    while the write lock is held, so the stock levels read here cannot
+    change before the decrements. Each unit comes from `room_id`, or else
+    from whichever room has the most left. Returns one result per scanned
+    barcode, in scan order.
+    """
+    barcodes = [barcode.strip() for barcode in barcodes if barcode and barcode.strip()]
+    if not barcodes:
+        return {"error": "Basket is empty", "items": []}
+    if len(barcodes) > MAX_BASKET_SIZE:
+        return {"error": f"Basket is limited to {MAX_BASKET_SIZE} tools", "items": []}
+
+    unique = list(dict.fromkeys(barcodes))
+    placeholders = ", ".join("?" * len(unique))
+    room_filter = "" if room_id is None else " AND tool_stock.room_id = ?"
+    params = ([] if room_id is None else [room_id]) + unique
+    checkout_time = current_timestamp()
+    items = []
+
+    try:
+        with immediate_transaction(conn):
+            tools = {}
+            shelves = {}
+            for row in conn.execute(
+                f"""
+                SELECT tools.id, tools.name, tools.barcode, tools.quantity, tool_stock.room_id,
+                       tool_stock.quantity AS on_shelf
+                FROM tools
+                LEFT JOIN tool_stock ON tool_stock.tool_id = tools.id AND tool_stock.quantity > 0{room_filter}
+                WHERE tools.barcode IN ({placeholders})
+                ORDER BY tool_stock.quantity DESC, tool_stock.room_id
+                """,
+                params,
+            ):
+                tools.setdefault(row["barcode"], row)
+                if row["room_id"] is not None:
+                    shelves.setdefault(row["barcode"], {})[row["room_id"]] = row["on_shelf"]
+
+            decrements = {}
+            for barcode in barcodes:
+                tool = tools.get(barcode)
+                rooms = shelves.get(barcode, {})
+                shelf = max(rooms, key=rooms.get) if rooms else None
+                if tool is None:
+                    items.append({"barcode": barcode, "error": "Unknown tool barcode"})
+                elif shelf is None or rooms[shelf] <= 0:
+                    items.append({"barcode": barcode, "tool_id": tool["id"], "error": "Tool is out of stock"})
+                else:
+                    rooms[shelf] -= 1
+                    decrements[(tool["id"], shelf)] = decrements.get((tool["id"], shelf), 0) + 1
+                    items.append({"barcode": barcode, "tool_id": tool["id"], "room_id": shelf,
+                                  "message": f"Checked out {tool['name']}"})
+
+            totals = {}
+            for (tool_id, shelf), count in decrements.items():
+                totals[tool_id] = totals.get(tool_id, 0) + count
+            conn.executemany(
+                "UPDATE tool_stock SET quantity = quantity - ? WHERE tool_id = ? AND room_id = ?",
+                [(count, tool_id, shelf) for (tool_id, shelf), count in decrements.items()],
+            )
+            conn.executemany(
+                "UPDATE tools SET quantity = quantity - ? WHERE id = ?",
+                [(count, tool_id) for tool_id, count in totals.items()],
+            )
+            conn.executemany(
+                "INSERT INTO transactions (user_id, tool_id, room_id, checkout_time) VALUES (?, ?, ?, ?)",
+                [(user_id, item["tool_id"], item["room_id"], checkout_time) for item in items if "message" in item],
+            )
+            # One event per shelf actually emptied from, like checkout_tool.
+            by_id = {tool["id"]: tool for tool in tools.values()}
+            for (tool_id, shelf), count in decrements.items():
+                event_log.publish(conn, "checkout", {"tool_id": tool_id, "tool_name": by_id[tool_id]["name"],
+                                                     "quantity": by_id[tool_id]["quantity"] - totals[tool_id],
+                                                     "room_id": shelf, "count": count})
+    except sqlite3.IntegrityError as exc:
+        if "FOREIGN KEY constraint failed" not in str(exc):
+            raise
+        return {"error": UNKNOWN_USER, "items": []}
+
+    checked_out = sum("message" in item for item in items)
+    return {"message": f"Checked out {checked_out} of {len(items)} tools", "items": items}
+
+
+LOG_PAGE_SIZE = 50
+
+
+def get_log_page(conn, user_id=None, tool_id=None, start_date=None, end_date=None,
+                 open_only=False, before=None, limit=LOG_PAGE_SIZE):
+    """Return one page of the transaction log, newest first.
+
+    Pages are keyed on (checkout_time, id) so each one is an index range
+    scan no matter how deep the user pages. `before` is the (checkout_time,
+    id) of the last row on the previous page. Returns (rows, next_cursor).
+    """
+    where = []
+    params = []
+    if user_id is not None:
+        where.append("transactions.user_id = ?")
+        params.append(user_id)
+    if tool_id is not None:
+        where.append("transactions.tool_id = ?")
+        params.append(tool_id)
+    if start_date:
+        where.append("transactions.checkout_time >= ?")
+        params.append(start_date.isoformat())
+    if end_date:
+        # Timestamps are stored as text, so "before the next day" is inclusive.
+        where.append("transactions.checkout_time < ?")
+        params.append((end_date + timedelta(days=1)).isoformat())
+    if open_only:
+        where.append("transactions.return_time IS NULL")
+    if before is not None:
+        where.append("(transactions.checkout_time, transactions.id) < (?, ?)")
+        params.extend(before)
+
+    sql = """
+        SELECT transactions.id, transactions.user_id, transactions.tool_id,
+               users.name AS user_name, tools.name AS tool_name,
+               transactions.checkout_time, transactions.return_time
+        FROM transactions
+        JOIN users ON transactions.user_id = users.id
+        JOIN tools ON transactions.tool_id = tools.id
+    """
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY transactions.checkout_time DESC, transactions.id DESC LIMIT ?"
+    params.append(limit + 1)
+
+    rows = conn.execute(sql, params).fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = (rows[-1]["checkout_time"], rows[-1]["id"])
+    return rows, next_cursor
@@ -0,0 +1,21 @@
+"""Production entry point for a multi-worker WSGI server.
+
+The app is built and its caches warmed once in the master process; workers
+are forked from it and share those pages copy-on-write. Pooled connections
+are closed before the fork, so no worker inherits an open SQLite handle,
+and pools notice the fork and start fresh in each worker.
+
+    gunicorn wsgi:application              # settings from gunicorn.conf.py
+    TOOL_DATABASE=/srv/tools/tool_management.db TOOL_SECRET_KEY=... gunicorn wsgi:application
+"""
+import logging
+
+from app import DEFAULT_CONFIG, create_app, warm_caches
+from database.connection import get_pool
+
+application = create_app()
+warm_caches(application)
+get_pool().close_all()
+
+if application.config["SECRET_KEY"] == DEFAULT_CONFIG["SECRET_KEY"]:
+    logging.getLogger(__name__).warning("TOOL_SECRET_KEY is not set; sessions use the built-in development key")